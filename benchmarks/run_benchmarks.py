@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+"""
+Offline benchmarks over the test fixtures: latency and throughput of
+Article.parse (with the breakdown of its stages), fulltext,
+DocumentCleaner.clean, ContentExtractor.calculate_best_node, PDF text
+extraction, stopword lookups and the TextRank of the longest text
+fixtures, plus the peak RSS of each benchmark, which runs in a process of
+its own. Results are written as JSON and can be compared with the
+results of another commit. Run from the repository root:
+
+    python benchmarks/run_benchmarks.py --output before.json
+    python benchmarks/run_benchmarks.py --output after.json --compare before.json
+    python benchmarks/run_benchmarks.py --only parse,cleaner --rounds 5
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import re
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from collections import OrderedDict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scraper import Article, Configuration, fulltext  # noqa: E402
+from scraper.content_extractor import ContentExtractor  # noqa: E402
+from scraper.document_cleaner import DocumentCleaner  # noqa: E402
+from scraper.parser import Parser  # noqa: E402
+from scraper.pdf import get_pdf_text  # noqa: E402
+from scraper.text import StopWords, get_stopwords  # noqa: E402
+
+__title__ = 'stimson-web-scraper'
+__author__ = 'Lucas Ou-Yang'
+__license__ = 'MIT'
+__copyright__ = 'Copyright 2014, Lucas Ou-Yang'
+__maintainer__ = "The Stimson Center"
+__maintainer_email = "cooper@pobox.com"
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+FIXTURES = os.path.join(ROOT, 'tests', 'fixtures')
+# fixtures of tests/fixtures/text ranked by the textrank benchmark
+TEXTRANK_FIXTURES = 3
+PARAGRAPH = 'The quick brown fox jumps over the lazy dog, and then it runs into the woods ' \
+            'where nobody can see it any more.'
+
+
+def read_fixtures(kind, extension, mode='r'):
+    """(name, content) of the fixtures in tests/fixtures/`kind`
+    """
+    fixtures = []
+    for filename in sorted(glob.glob(os.path.join(FIXTURES, kind, '*.%s' % extension))):
+        encoding = 'utf-8' if mode == 'r' else None
+        with open(filename, mode, encoding=encoding) as f:
+            fixtures.append((os.path.basename(filename)[:-len(extension) - 1], f.read()))
+    return fixtures
+
+
+def peak_rss():
+    """Peak resident set size of this process in bytes, since it started
+    """
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def summarize(latencies, total_bytes):
+    """Statistics of the per item `latencies` of the fastest round
+    """
+    total = sum(latencies)
+    ordered = sorted(latencies)
+    return OrderedDict([
+        ('items', len(latencies)),
+        ('mean_ms', total / len(latencies) * 1e3),
+        ('median_ms', statistics.median(ordered) * 1e3),
+        ('p95_ms', ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1e3),
+        ('max_ms', ordered[-1] * 1e3),
+        ('items_per_second', len(latencies) / total if total else None),
+        ('mb_per_second', total_bytes / total / 1e6 if total else None),
+    ])
+
+
+def run_rounds(items, run_item, rounds):
+    """Runs `run_item` over every item `rounds` times, returns the latencies
+    of the fastest round. `run_item` returns a callable doing the timed work
+    so setup such as parsing html is left out
+    """
+    best = None
+    for _ in range(rounds):
+        latencies = []
+        for item in items:
+            work = run_item(item)
+            start = time.perf_counter()
+            work()
+            latencies.append(time.perf_counter() - start)
+        if best is None or sum(latencies) < sum(best):
+            best = latencies
+    return best
+
+
+def article_config():
+    config = Configuration()
+    config.fetch_images = False
+    return config
+
+
+def bench_parse(rounds):
+    """Article.parse over the html fixtures, with the mean time of each of
+    its stages, see Article.timings
+    """
+    fixtures = read_fixtures('html', 'html')
+    config = article_config()
+    stages = OrderedDict()
+
+    def run_item(fixture):
+        name, html = fixture
+        article = Article('http://www.%s/article.html' % name, config=config)
+        article.download(input_html=html)
+
+        def work():
+            article.parse()
+            for stage, timing in article.timings.items():
+                if stage != 'download':
+                    stages.setdefault(stage, []).append(timing.wall)
+        return work
+
+    latencies = run_rounds(fixtures, run_item, rounds)
+    result = summarize(latencies, sum(len(html.encode('utf-8')) for name, html in fixtures))
+    result['stages_mean_ms'] = OrderedDict(
+        (stage, sum(walls) / len(walls) * 1e3) for stage, walls in stages.items())
+    return result
+
+
+def bench_fulltext(rounds):
+    fixtures = read_fixtures('html', 'html')
+    latencies = run_rounds(fixtures, lambda fixture: lambda: fulltext(fixture[1]), rounds)
+    return summarize(latencies, sum(len(html.encode('utf-8')) for name, html in fixtures))
+
+
+def bench_cleaner(rounds):
+    fixtures = read_fixtures('html', 'html')
+    cleaner = DocumentCleaner(Configuration())
+
+    def run_item(fixture):
+        doc = Parser.from_string(fixture[1])
+        return lambda: cleaner.clean(doc)
+
+    latencies = run_rounds(fixtures, run_item, rounds)
+    return summarize(latencies, sum(len(html.encode('utf-8')) for name, html in fixtures))
+
+
+def bench_best_node(rounds):
+    fixtures = read_fixtures('html', 'html')
+    config = Configuration()
+    cleaner = DocumentCleaner(config)
+
+    def run_item(fixture):
+        doc = cleaner.clean(Parser.from_string(fixture[1]))
+        extractor = ContentExtractor(config)
+        return lambda: extractor.calculate_best_node(doc, fixture[1])
+
+    latencies = run_rounds(fixtures, run_item, rounds)
+    return summarize(latencies, sum(len(html.encode('utf-8')) for name, html in fixtures))
+
+
+def bench_pdf(rounds):
+    fixtures = read_fixtures('pdf', 'pdf', mode='rb')
+    latencies = run_rounds(fixtures, lambda fixture: lambda: get_pdf_text(fixture[1]), rounds)
+    return summarize(latencies, sum(len(content) for name, content in fixtures))
+
+
+def bench_stopwords(rounds):
+    """Stopword lookups, every item is a batch of 1000 calls
+    """
+    stopwords = StopWords(language='en')
+    calls = OrderedDict([
+        ('get_stopwords', lambda: get_stopwords('en')),
+        ('StopWords', lambda: StopWords(language='en')),
+        ('get_stopword_count', lambda: stopwords.get_stopword_count(PARAGRAPH)),
+    ])
+    result = OrderedDict()
+    for name, call in calls.items():
+        def work():
+            for _ in range(1000):
+                call()
+        latencies = run_rounds([None], lambda item: work, rounds)
+        result['%s_us' % name] = latencies[0] / 1000 * 1e6
+    return result
+
+
+def bench_textrank(rounds):
+    """Word ranking of TextRank4Keyword over the longest text fixtures,
+    split in sentences and words without a spaCy model
+    """
+    from scraper.named_entity_recognition import rank_words
+    fixtures = read_fixtures('text', 'txt')
+    fixtures = sorted(fixtures, key=lambda fixture: len(fixture[1]), reverse=True)[:TEXTRANK_FIXTURES]
+
+    def run_item(fixture):
+        sentences = [re.findall(r'\w+', sentence) for sentence in re.split(r'[.!?]\s+', fixture[1])]
+        sentences = [sentence for sentence in sentences if sentence]
+        vocab = OrderedDict()
+        for word in (word for sentence in sentences for word in sentence):
+            vocab.setdefault(word, len(vocab))
+        return lambda: rank_words(vocab, sentences)
+
+    latencies = run_rounds(fixtures, run_item, rounds)
+    return summarize(latencies, sum(len(text.encode('utf-8')) for name, text in fixtures))
+
+
+BENCHMARKS = OrderedDict([
+    ('parse', bench_parse),
+    ('fulltext', bench_fulltext),
+    ('cleaner', bench_cleaner),
+    ('best_node', bench_best_node),
+    ('pdf', bench_pdf),
+    ('stopwords', bench_stopwords),
+    ('textrank', bench_textrank),
+])
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(names, rounds, in_process=False):
+    """Runs the benchmarks `names`, each in a process of its own unless
+    `in_process`, then the peak RSS is the one of all of them so far
+    """
+    results = OrderedDict([
+        ('commit', git_commit()),
+        ('time', time.strftime('%Y-%m-%dT%H:%M:%S')),
+        ('python', platform.python_version()),
+        ('platform', platform.platform()),
+        ('rounds', rounds),
+        ('benchmarks', OrderedDict()),
+    ])
+    for name in names:
+        if not in_process:
+            results['benchmarks'][name] = run_in_subprocess(name, rounds)
+            continue
+        print('running %s' % name, file=sys.stderr)
+        # noinspection PyBroadException
+        try:
+            result = BENCHMARKS[name](rounds)
+        except Exception as ex:
+            # e.g. a native dependency missing here, the other benchmarks still run
+            result = OrderedDict([('error', '%s: %s' % (type(ex).__name__, ex))])
+        result['peak_rss_bytes'] = peak_rss()
+        results['benchmarks'][name] = result
+    return results
+
+
+def run_in_subprocess(name, rounds):
+    """Result of the benchmark `name` run in a new process, whose peak RSS
+    doesn't include the memory of the benchmarks before it
+    """
+    command = [sys.executable, os.path.abspath(__file__), '--only', name, '--rounds', str(rounds), '--in-process']
+    try:
+        output = subprocess.check_output(command, cwd=ROOT)
+    except (OSError, subprocess.CalledProcessError) as ex:
+        return OrderedDict([('error', '%s: %s' % (type(ex).__name__, ex))])
+    return json.loads(output.decode('utf-8'), object_pairs_hook=OrderedDict)['benchmarks'][name]
+
+
+def compare(results, baseline):
+    """Prints the ratio of every timing of `results` to the one of
+    `baseline`, below 1 is faster
+    """
+    print('%-40s %12s %12s %8s' % ('', 'baseline', 'current', 'ratio'))
+    for name, result in results['benchmarks'].items():
+        base = baseline.get('benchmarks', {}).get(name, {})
+        flat = dict(result, **result.get('stages_mean_ms', {}))
+        base_flat = dict(base, **base.get('stages_mean_ms', {}))
+        for key, value in flat.items():
+            if not (key.endswith('_ms') or key.endswith('_us')) or not isinstance(value, float):
+                continue
+            old = base_flat.get(key)
+            ratio = '%8.2f' % (value / old) if old else '%8s' % '-'
+            print('%-40s %12.3f %12.3f %s' % ('%s.%s' % (name, key), old or 0, value, ratio))
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--only', help='comma separated benchmarks, among %s' % ', '.join(BENCHMARKS))
+    arg_parser.add_argument('--rounds', type=int, default=3, help='the fastest round is kept')
+    arg_parser.add_argument('--output', help='JSON file for the results, printed when not given')
+    arg_parser.add_argument('--compare', help='JSON results of an earlier run to compare with')
+    arg_parser.add_argument('--in-process', action='store_true',
+                            help='run the benchmarks in this process rather than one process each')
+    args = arg_parser.parse_args(argv)
+
+    names = args.only.split(',') if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        arg_parser.error('unknown benchmarks: %s' % ', '.join(unknown))
+
+    results = run(names, args.rounds, args.in_process)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(results, json.load(f))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
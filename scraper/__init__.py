@@ -6,11 +6,23 @@ Wherever smart people work, doors are unlocked. -- Steve Wozniak
 # Set default logging handler to avoid "No handler found" warnings.
 import logging
 
-from .article import Article, ArticleException
+from .article import Article, ArticleException, download_articles, nlp_batch
 from .configuration import Configuration
+from .pipeline import build_articles
+from .timings import add_timing_hook, remove_timing_hook
 from .utils import get_languages, fulltext
 from .version import __version__
 
+
+def warm_pipelines(language_codes, profile='full'):
+    """Loads the spaCy pipelines of `language_codes` for the NLP `profile`
+    ahead of time, spaCy itself is only imported by this call or the first
+    Article.nlp()
+    """
+    from .language_models import warm_pipelines
+    warm_pipelines(language_codes, profile)
+
+
 __title__ = 'stimson-web-scraper'
 __author__ = 'Lucas Ou-Yang'
 __license__ = 'MIT'
@@ -6,16 +6,11 @@ import datetime
 import glob
 import logging
 import os
-# With lazy-loading
-import pytextrank
-import requests
-import spacy
+from collections import OrderedDict
 from urllib.parse import urlparse
 
+import requests
 
-from bs4 import BeautifulSoup
-# https://preslav.me/2019/01/09/dotenv-files-python/
-from fake_useragent import UserAgent
 
 from scraper.urls import extract_domain
 from scraper.video_extractor import VideoExtractor
@@ -26,9 +21,9 @@ from . import urls
 from .configuration import Configuration
 from .content_extractor import ContentExtractor
 from .document_cleaner import DocumentCleaner
-from .named_entity_recognition import TextRank4Keyword
 from .output_formatter import OutputFormatter
 from .text import get_stopwords
+from .timings import Timings
 from .utils import (URLHelper, RawHelper, extend_config,
                     get_language_codes, extract_meta_refresh,
                     parse_date_str, split_words)
@@ -137,6 +132,11 @@ class Article(object):
 
         # Keep state for downloads and parsing
         self.download_exception_msg = None
+        # reader of the metadata of PDF documents, which is only built when
+        # its attributes are first read, by parse() or by the caller
+        self.pdf = None
+        # why build_articles() could not parse or nlp the article
+        self.build_exception_msg = None
 
         # Meta description field in the HTML source
         self.meta_description = ""
@@ -162,14 +162,19 @@ class Article(object):
 
         # A deepcopied clone of the above object before heavy parsing
         # operations, useful for users to query data in the
-        # "most important part of the page"
+        # "most important part of the page", only kept if
+        # `config.keep_clean_doc` is set
         self.clean_top_node = None
 
+        # URL of the first image within `top_node`
+        self.first_img = ''
+
         # lxml DOM object generated from HTML
         self.doc = None
 
         # A deepcopied clone of the above object before undergoing heavy
-        # cleaning operations, serves as an API if users need to query the DOM
+        # cleaning operations, serves as an API if users need to query the DOM,
+        # only kept if `config.keep_clean_doc` is set
         self.clean_doc = None
 
         # A property dict for users to store custom data.
@@ -179,40 +184,45 @@ class Article(object):
 
         self.tables = []
 
+        # Wall time, CPU time and bytes of every stage, see timings.py
+        self.timings = Timings(self.config.profile_stages, self.config.trace_memory)
+
         self.workflow = []
         self.process = 0
         self.thread_id = 0
         self.set_workflow(INIT)
 
     # PUBLIC API
-    def download(self, input_html=None, title=None, recursion_counter=0):
-        """Downloads the link's HTML content, don't use if you are batch async
-        downloading articles
+    def download(self, input_html=None, title=None, recursion_counter=0, pdf_file_reader=None):
+        """Downloads the link's HTML content, if you are batch downloading
+        articles use download_articles() which passes the fetched content
+        in as `input_html` (and `pdf_file_reader` for PDFs). The text of
+        PDF documents is set here, but like html pages they are only
+        PARSED by parse(), which reads their author and creation date
 
         recursion_counter (currently 1) stops refreshes that are potentially
         infinite
         """
         global DOWNLOADED
-        pdf_file_reader = None
+        # the document of an earlier download
+        self.pdf = None
         if input_html is None:
-            parsed_url = urlparse(self.url)
-            if parsed_url.scheme == "file":
-                html = self._parse_scheme_file(parsed_url.path)
-            else:
-                html, pdf_file_reader = self._parse_scheme_http()
-                if pdf_file_reader:
-                    # if response.content started with "%PDF-"
-                    self.set_authors([pdf_file_reader.documentInfo.author])
-                    creation_date = pdf_file_reader.documentInfo.getText("/CreationDate").replace("D:", "")
-                    self.set_publish_date(parse_date_str(creation_date[0:8]))
-                    self.set_text(html.strip())
-                    # don't bother parsing HTML later, there is no HTML here, just raw text
-                    self.set_workflow(PARSED)
-            if html is None:
-                raise ArticleException(self.download_exception_msg)
+            with self.measure('download') as timing:
+                parsed_url = urlparse(self.url)
+                if parsed_url.scheme == "file":
+                    html = self._parse_scheme_file(parsed_url.path)
+                else:
+                    html, pdf_file_reader = self._parse_scheme_http()
+                if html is None:
+                    raise ArticleException(self.download_exception_msg)
+                timing.bytes += len(html)
         else:
             html = input_html
 
+        if pdf_file_reader:
+            # if response.content started with "%PDF-"
+            self.set_pdf(html, pdf_file_reader)
+
         if not pdf_file_reader and self.config.follow_meta_refresh:
             meta_refresh_url = extract_meta_refresh(html)
             if meta_refresh_url and recursion_counter < 1:
@@ -223,155 +233,186 @@ class Article(object):
         self.set_title(title)
         self.set_workflow(DOWNLOADED)
 
+    def set_pdf(self, text, pdf_file_reader):
+        """PDF documents have no HTML, only their raw text and metadata,
+        which parse() reads from `pdf_file_reader`
+        """
+        self.pdf = pdf_file_reader
+        self.set_text(text.strip())
+
+    def set_pdf_metadata(self):
+        global PARSED
+        with self.measure('pdf'):
+            self.set_authors([self.pdf.documentInfo.author])
+            creation_date = self.pdf.documentInfo.getText("/CreationDate").replace("D:", "")
+            self.set_publish_date(parse_date_str(creation_date[0:8]))
+        self.set_workflow(PARSED)
+
     # PUBLIC API
     def parse(self):
         global PARSED
         self.throw_if_not_downloaded_verbose()
 
-        self.doc = self.config.get_parser().from_string(self.html)
-        self.clean_doc = copy.deepcopy(self.doc)
-
-        if self.doc is None:
-            # `parse` call failed, return nothing
+        if self.pdf is not None:
+            # don't bother parsing HTML, there is no HTML here, just raw text
+            self.set_pdf_metadata()
             return
 
-        # TODO: Fix this, sync in our fix_url() method
-        parse_candidate = self.get_parse_candidate()
-        self.link_hash = parse_candidate.link_hash  # MD5
+        with self.measure('parse') as timing:
+            timing.bytes += len(self.html)
+            with self.measure('parse.dom'):
+                self.doc = self.config.get_parser().from_string(self.html)
 
-        document_cleaner = DocumentCleaner(self.config)
-        output_formatter = OutputFormatter(self.config)
+            if self.doc is None:
+                # `parse` call failed, return nothing
+                return
 
-        title = self.extractor.get_title(self.clean_doc)
-        self.set_title(title)
+            if self.config.keep_clean_doc:
+                self.clean_doc = copy.deepcopy(self.doc)
 
-        authors = self.extractor.get_authors(self.clean_doc)
-        self.set_authors(authors)
+            # TODO: Fix this, sync in our fix_url() method
+            parse_candidate = self.get_parse_candidate()
+            self.link_hash = parse_candidate.link_hash  # MD5
 
-        meta_lang = self.extractor.get_meta_lang(self.clean_doc)
-        self.set_meta_language(meta_lang)
+            document_cleaner = DocumentCleaner(self.config)
+            output_formatter = OutputFormatter(self.config)
 
-        if self.config.use_meta_language:
-            self.extractor.update_language(self.meta_lang)
-            output_formatter.update_language(self.meta_lang)
+            # metadata is extracted from the pristine DOM, before the
+            # document cleaner mutates it, so no copy of the DOM is needed
+            with self.measure('parse.metadata'):
+                title = self.extractor.get_title(self.doc)
+                self.set_title(title)
 
-        meta_favicon = self.extractor.get_favicon(self.clean_doc)
-        self.set_meta_favicon(meta_favicon)
+                authors = self.extractor.get_authors(self.doc)
+                self.set_authors(authors)
 
-        meta_site_name = self.extractor.get_meta_site_name(self.clean_doc)
-        self.set_meta_site_name(meta_site_name)
+                meta_lang = self.extractor.get_meta_lang(self.doc)
+                self.set_meta_language(meta_lang)
 
-        meta_description = self.extractor.get_meta_description(self.clean_doc)
-        self.set_meta_description(meta_description)
+                if self.config.use_meta_language:
+                    self.extractor.update_language(self.meta_lang)
+                    output_formatter.update_language(self.meta_lang)
 
-        canonical_link = self.extractor.get_canonical_link(self.url, self.clean_doc)
-        self.set_canonical_link(canonical_link)
+                meta_favicon = self.extractor.get_favicon(self.doc)
+                self.set_meta_favicon(meta_favicon)
 
-        tags = self.extractor.extract_tags(self.clean_doc)
-        self.set_tags(tags)
+                meta_site_name = self.extractor.get_meta_site_name(self.doc)
+                self.set_meta_site_name(meta_site_name)
 
-        meta_keywords = self.extractor.get_meta_keywords(
-            self.clean_doc)
-        self.set_meta_keywords(meta_keywords)
+                meta_description = self.extractor.get_meta_description(self.doc)
+                self.set_meta_description(meta_description)
 
-        meta_data = self.extractor.get_meta_data(self.clean_doc)
-        self.set_meta_data(meta_data)
+                canonical_link = self.extractor.get_canonical_link(self.url, self.doc)
+                self.set_canonical_link(canonical_link)
 
-        self.set_publish_date(self.extractor.get_publishing_date(self.url, self.clean_doc))
+                tags = self.extractor.extract_tags(self.doc)
+                self.set_tags(tags)
 
-        # Before any computations on the body, clean DOM object
-        self.doc = document_cleaner.clean(self.doc)
+                meta_keywords = self.extractor.get_meta_keywords(
+                    self.doc)
+                self.set_meta_keywords(meta_keywords)
 
-        self.top_node = self.extractor.calculate_best_node(self.doc, self.html)
-        if self.top_node is not None:
-            video_extractor = VideoExtractor(self.config, self.top_node)
-            self.set_movies(video_extractor.get_videos())
+                meta_data = self.extractor.get_meta_data(self.doc)
+                self.set_meta_data(meta_data)
 
-            self.top_node = self.extractor.post_cleanup(self.top_node)
-            self.clean_top_node = copy.deepcopy(self.top_node)
+                self.set_publish_date(self.extractor.get_publishing_date(self.url, self.doc))
 
-            text, article_html = output_formatter.get_formatted(self.top_node)
-            self.set_article_html(article_html)
-            self.set_text(text)
+            with self.measure('parse.images'):
+                self.set_image_urls(self.doc)
 
-        self.fetch_images()
-        self.release_resources()
-        url = self.url.lower()
-        if url.find(".wikipedia.org/wiki/") >= 0:
-            self.parse_tables(attributes={"class": "wikitable"})
-        self.set_workflow(PARSED)
+            url = self.url.lower()
+            if url.find(".wikipedia.org/wiki/") >= 0:
+                self.parse_tables(attributes={"class": "wikitable"}, doc=self.doc)
+
+            # Before any computations on the body, clean DOM object
+            self.extractor.release_index()
+            with self.measure('parse.cleaner'):
+                self.doc = document_cleaner.clean(self.doc)
+
+            with self.measure('parse.best_node'):
+                self.top_node = self.extractor.calculate_best_node(self.doc, self.html)
+            if self.top_node is not None:
+                with self.measure('parse.videos'):
+                    video_extractor = VideoExtractor(self.config, self.top_node)
+                    self.set_movies(video_extractor.get_videos())
+
+                with self.measure('parse.post_cleanup'):
+                    self.top_node = self.extractor.post_cleanup(self.top_node)
+                # the output formatter mutates the top node, take what we need first
+                self.first_img = self.extractor.get_first_img_url(self.url, self.top_node)
+                if self.config.keep_clean_doc:
+                    # gravity scores are kept off the DOM unless it is inspected
+                    self.extractor.set_gravity_attributes()
+                    self.clean_top_node = copy.deepcopy(self.top_node)
+
+                with self.measure('parse.formatter') as formatter_timing:
+                    text, article_html = output_formatter.get_formatted(self.top_node)
+                    formatter_timing.bytes += len(text)
+                self.set_article_html(article_html)
+                self.set_text(text)
+                self.extractor.release_gravity_scores()
+
+            self.fetch_images()
+            self.release_resources()
+            self.set_workflow(PARSED)
 
     # PUBLIC API
     def nlp(self):
         """Keyword extraction wrapper
         """
-        global NLPED
         self.throw_if_not_downloaded_verbose()
         self.throw_if_not_parsed_verbose()
 
-        # With Lazy Loading
-        # nlp = MultiLanguage()
-        # nlp = get_lang_class('xx')
-
-        language_code = self.config.get_language()[0:2]
-        # https://spacy.io/usage/models
-        spacy_language_models = {
-            "zh": "zh_core_web_sm",  # Chinese
-            "da": "da_core_news_sm",  # Danish
-            "nl": "nl_core_news_sm",  # Dutch
-            "en": "en_core_web_sm",  # English
-            "fr": "fr_core_news_sm",  # French
-            "de": "de_core_news_sm",  # German
-            "el": "el_core_news_sm",  # Greek
-            "it": "it_core_news_sm",  # Italian
-            "ja": "ja_core_news_sm",  # Japanese
-            "lt": "lt_core_news_sm",  # Lithuanian
-            "nb": "nb_core_news_sm",  # Norwegian Bokmål
-            "pl": "pl_core_news_sm",  # Polish
-            "pt": "pt_core_news_sm",  # Portuguese
-            "ro": "ro_core_news_sm",  # Romanian
-            "es": "es_core_news_sm"  # Spanish
-        }
-        if language_code in spacy_language_models:
-            nlp = spacy.load(spacy_language_models[language_code])
-        else:
-            # https://github.com/huggingface/neuralcoref/issues/117
-            # nlp = spacy.load("xx_ent_wiki_sm", disable = ['ner', 'parser', 'tagger'])
-            nlp = spacy.load("xx_ent_wiki_sm")
-            nlp.add_pipe(nlp.create_pipe('sentencizer'))
-        # use spacy language specific STOP WORDS
-        stopwords = get_stopwords(language_code)
-        # add PyTextRank to the spaCy pipeline
-        tr = pytextrank.TextRank()
-        nlp.add_pipe(tr.PipelineComponent, name="textrank", last=True)
-        # *************************************************************
-        # THIS STEP CAN TAKE A MINUTE OR TWO
-        tr4w = TextRank4Keyword(nlp)
-        tr4w.analyze(self.text.lower(), candidate_pos=['NOUN', 'PROPN'], window_size=4, lower=False,
-                     stopwords=stopwords)
-        keywords = list()
-        for k, v in tr4w.get_keywords().items():
-            keywords.append(k)
-        if len(keywords) == 0:
-            keywords = self.xx_keywords(stopwords)
-        self.set_keywords(keywords)
-        summary = ''.join(map(str, tr4w.get_sentences()))
-        self.set_summary(summary)
+        # spaCy and the date parsers take seconds to import, only nlp needs them
+        from .language_models import get_pipeline, get_profile_results
+        from .named_entity_recognition import TextRank4Keyword
+
+        with self.measure('nlp') as timing:
+            timing.bytes += len(self.text)
+            language_code = self.config.get_language()[0:2]
+            results = get_profile_results(self.config.nlp_profile)
+            # spaCy + PyTextRank pipelines are loaded once per process and reused
+            with self.measure('nlp.pipeline'):
+                nlp = get_pipeline(language_code, self.config.nlp_profile)
+            # use spacy language specific STOP WORDS
+            stopwords = get_stopwords(language_code)
+            tr4w = TextRank4Keyword(nlp)
+            tr4w.analyze(self.text.lower(), candidate_pos=['NOUN', 'PROPN'], window_size=4, lower=False,
+                         stopwords=stopwords, keywords='keywords' in results)
+            self.set_nlp_results(tr4w, stopwords, results)
+
+    def set_nlp_results(self, tr4w, stopwords, results=None):
+        """Copies keywords, summary, fallback title and date out of an
+        analyzed TextRank4Keyword, shared by nlp() and nlp_batch(). Only
+        the `results` of the NLP profile are set, all of them if None
+        """
+        global NLPED
+        if results is None or 'keywords' in results:
+            keywords = list()
+            for k, v in tr4w.get_keywords().items():
+                keywords.append(k)
+            if len(keywords) == 0:
+                keywords = self.xx_keywords(stopwords)
+            self.set_keywords(keywords)
+        if results is None or 'summary' in results:
+            summary = ''.join(map(str, tr4w.get_sentences()))
+            self.set_summary(summary)
         # try to make a title from the top phrase if title not found in html or PDF
-        if not self.title or len(self.title.strip()) == 0:
+        if (results is None or 'title' in results) and (not self.title or len(self.title.strip()) == 0):
             for phrase in tr4w.get_phrases():
                 self.set_title(phrase.text.strip())
                 break
-        # try to get date from raw text if not found in html
-        current_date = datetime.date.today()
-        if self.publish_date == current_date:
-            dates = tr4w.get_dates()
+        # try to get date from raw text if not found in html, publish_date
+        # is today's date until one is found
+        current_date = datetime.date.today().strftime(date_format)
+        if (results is None or 'dates' in results) and self.publish_date == current_date:
+            dates = tr4w.get_dates(self.config.extract_text_dates, self.config.date_parser_settings)
+            dates = [date for date in dates if date]
             if dates:
                 # even if there are multiple dates returned, usually the first date is best to use
                 self.set_publish_date(dates[0])
         self.set_workflow(NLPED)
 
-
     # PUBLIC API
     def get_json(self):
         return {
@@ -458,75 +499,22 @@ class Article(object):
 
         return top_keywords
 
-    def parse_tables(self, attributes=None):
+    def parse_tables(self, attributes=None, doc=None):
+        """Extracts the tables matching `attributes` out of the already
+        downloaded page, e.g. the "wikitable"s of Wikipedia articles.
+        `doc` must not have been cleaned yet, it defaults to the page html
+        """
         if attributes is None:
             attributes = {"class": "wikitable"}
-        ua = UserAgent()
-        response = requests.get(self.url, headers={'User-Agent': ua.random})
-        soup = BeautifulSoup(response.text, 'html.parser')
-        tables = soup.findAll("table", attributes)
-
-        # # show tables
-        # for i, table in enumerate(tables):
-        #     print("#"*10 + "Table {}".format(i) + '#'*10)
-        #     print(table.text[:100])
-        #     print('.'*80)
-        # print("#"*80)
-
-        self.tables = list()
-        for tn, table in enumerate(tables):
-            # preinit list of lists
-            # noinspection PyUnusedLocal,PyBroadException
-            try:
-                caption = table.find('caption')
-                table_name = caption.get_text().rstrip()
-            except Exception as ex:
-                table_name = f"{tn}"
-            rows = table.findAll("tr")
-            row_lengths = [len(r.findAll(['th', 'td'])) for r in rows]
-            ncols = max(row_lengths)
-            nrows = len(rows)
-            data = []
-            for i in range(nrows):
-                row_data = []
-                for j in range(ncols):
-                    row_data.append('')
-                data.append(row_data)
-
-            # process html
-            for i in range(len(rows)):
-                row = rows[i]
-                row_data = []
-                cells = row.findAll(["td", "th"])
-                for j in range(len(cells)):
-                    cell = cells[j]
-
-                    # lots of cells span cols and rows so lets deal with that
-                    cspan = int(cell.get('colspan', 1))
-                    rspan = int(cell.get('rowspan', 1))
-                    # noinspection PyPep8
-                    l = 0
-                    for k in range(rspan):
-                        # Shifts to the first empty cell of this row
-                        # noinspection PyUnusedLocal,PyBroadException
-                        try:
-                            while data[i + k][j + l]:
-                                l += 1
-                        except Exception as ex:
-                            if l:
-                                l -= 1
-                            pass
-                        for m in range(cspan):
-                            cell_n = j + l + m
-                            row_n = i + k
-                            # in some cases the colspan can overflow the table, in those cases
-                            # just get the last item
-                            cell_n = min(cell_n, len(data[row_n]) - 1)
-                            data[row_n][cell_n] += cell.text
-                            # print(cell.text)
-
-                data.append(row_data)
-            self.tables.append({'name': table_name, 'rows': data})
+        parser = self.config.get_parser()
+        with self.measure('parse_tables'):
+            if doc is None:
+                doc = self.clean_doc if self.clean_doc is not None else parser.from_string(self.html)
+            self.tables = list()
+            for tn, table in enumerate(parser.get_tables(doc, attributes)):
+                captions = parser.get_elements_by_tag(table, tag='caption')
+                table_name = captions[0].text_content().rstrip() if captions else f"{tn}"
+                self.tables.append({'name': table_name, 'rows': parser.table_to_rows(table)})
 
     def _parse_scheme_file(self, path):
         try:
@@ -549,27 +537,34 @@ class Article(object):
         self.download_exception_msg = str(ex)
         raise ex
 
+    def set_image_urls(self, doc):
+        """Collects the meta image and all image urls of the page `doc`,
+        no image is downloaded
+        """
+        meta_img_url = self.extractor.get_meta_img_url(self.url, doc)
+        self.set_meta_img(meta_img_url)
+
+        imgs = self.extractor.get_img_urls(self.url, doc)
+        if self.meta_img:
+            imgs.add(self.meta_img)
+        self.set_imgs(imgs)
+
     def fetch_images(self):
-        if self.clean_doc is not None:
-            meta_img_url = self.extractor.get_meta_img_url(
-                self.url, self.clean_doc)
-            self.set_meta_img(meta_img_url)
-
-            imgs = self.extractor.get_img_urls(self.url, self.clean_doc)
-            if self.meta_img:
-                imgs.add(self.meta_img)
-            self.set_imgs(imgs)
-
-        if self.clean_top_node is not None and not self.has_top_image():
-            first_img = self.extractor.get_first_img_url(
-                self.url, self.clean_top_node)
-            if self.config.fetch_images:
-                self.set_top_img(first_img)
-            else:
-                self.set_top_img_no_check(first_img)
+        with self.measure('fetch_images'):
+            if self.first_img and not self.has_top_image():
+                if self.config.fetch_images:
+                    self.set_top_img(self.first_img)
+                else:
+                    self.set_top_img_no_check(self.first_img)
 
-        if not self.has_top_image() and self.config.fetch_images:
-            self.set_reddit_top_img()
+            if not self.has_top_image() and self.config.fetch_images:
+                self.set_reddit_top_img()
+
+    def measure(self, stage):
+        """Context manager adding the time spent in its block to the
+        timings of `stage`
+        """
+        return self.timings.measure(stage, self)
 
     def has_top_image(self):
         return self.top_img is not None and self.top_img != ''
@@ -598,9 +593,7 @@ class Article(object):
         initialization to garbage collection
         """
         res_dir_fn = 'article_resources'
-        resource_directory = os.path.join(settings.TOP_DIRECTORY, res_dir_fn)
-        if not os.path.exists(resource_directory):
-            os.mkdir(resource_directory)
+        resource_directory = settings.ensure_directory(os.path.join(settings.TOP_DIRECTORY, res_dir_fn))
         dir_path = os.path.join(resource_directory, '%s_' % self.link_hash)
         return dir_path
 
@@ -775,3 +768,63 @@ class Article(object):
         """
         if PARSED not in self.workflow:
             raise ArticleException('You must `parse()` an article first!')
+
+
+def download_articles(articles, config=None):
+    """Downloads many articles concurrently, at most `config.number_threads`
+    at a time and `config.max_connections_per_host` per host. Articles whose
+    download failed keep the reason in `download_exception_msg` and are not
+    marked DOWNLOADED
+    """
+    articles = list(articles)
+    remote_articles = []
+    for article in articles:
+        if urlparse(article.url).scheme == "file":
+            try:
+                article.download()
+            except ArticleException:
+                pass
+        else:
+            remote_articles.append(article)
+
+    config = config or (remote_articles[0].config if remote_articles else None)
+    mrequests = network.async_request([article.url for article in remote_articles], config)
+    for article, mrequest in zip(remote_articles, mrequests):
+        if mrequest.exception is not None:
+            article.download_exception_msg = str(mrequest.exception)
+            continue
+        article.download(input_html=mrequest.html, pdf_file_reader=mrequest.pdf_file_reader)
+    return articles
+
+
+def nlp_batch(articles, batch_size=64, n_process=1):
+    """Keyword extraction over many parsed articles at once. Articles are
+    grouped by language and NLP profile and their texts streamed through
+    spaCy's nlp.pipe() so tokenizer/tagger overhead is amortized across the
+    batch.
+    n_process > 1 forks worker processes, see spaCy's Language.pipe()
+    """
+    from .language_models import get_pipeline, get_profile_results
+    from .named_entity_recognition import TextRank4Keyword
+
+    articles = list(articles)
+    articles_by_pipeline = OrderedDict()
+    for article in articles:
+        article.throw_if_not_downloaded_verbose()
+        article.throw_if_not_parsed_verbose()
+        language_code = article.config.get_language()[0:2]
+        articles_by_pipeline.setdefault((language_code, article.config.nlp_profile), []).append(article)
+
+    for (language_code, profile), pipeline_articles in articles_by_pipeline.items():
+        results = get_profile_results(profile)
+        nlp = get_pipeline(language_code, profile)
+        stopwords = get_stopwords(language_code)
+        tr4w = TextRank4Keyword(nlp)
+        tr4w.set_stopwords(stopwords)
+        texts = (article.text.lower() for article in pipeline_articles)
+        docs = nlp.pipe(texts, batch_size=batch_size, n_process=n_process)
+        for article, doc in zip(pipeline_articles, docs):
+            tr4w.analyze_doc(doc, candidate_pos=['NOUN', 'PROPN'], window_size=4, lower=False,
+                             keywords='keywords' in results)
+            article.set_nlp_results(tr4w, stopwords, results)
+    return articles
@@ -39,6 +39,8 @@ class Configuration(object):
 
         # max number of urls we cache for each news source
         self.MAX_FILE_MEMO = 20000
+        # seconds memoized urls are remembered, None for ever
+        self.memo_ttl = 30 * 24 * 3600
 
         # Cache and save articles run after run
         # https://en.wikipedia.org/wiki/Memoization
@@ -57,6 +59,11 @@ class Configuration(object):
         # You may keep the html of just the main article body
         self.keep_article_html = False
 
+        # Keep deep copies of the DOM and of the top node as they were
+        # before cleaning, in `Article.clean_doc` and `Article.clean_top_node`,
+        # the scored nodes then carry gravityScore/gravityNodes attributes
+        self.keep_clean_doc = False
+
         # Fail for error responses (e.g. 404 page)
         self.http_success_only = True
 
@@ -69,10 +76,52 @@ class Configuration(object):
         self.browser_user_agent = 'scraper/%s' % __version__
         self.headers = {}
         self.request_timeout = 120
+        # responses are read in chunks, bigger or binary ones are abandoned
+        # as soon as they are recognized, None for no size limit
+        self.max_download_size = 50 * 1024 * 1024  # bytes
+        self.download_chunk_size = 64 * 1024  # bytes
+
+        # text is extracted from the first max_pdf_pages pages of PDF
+        # documents, None for all, documents long enough are split among
+        # pdf_processes processes, see pdf.MIN_PAGES_PER_PROCESS
+        self.max_pdf_pages = None
+        self.pdf_processes = 1
+
+        # Keep downloaded pages on disk and revalidate them with conditional
+        # requests once older than http_cache_ttl seconds, unless their
+        # Cache-Control says otherwise, see http_cache.py
+        self.use_http_cache = False
+        self.http_cache_ttl = 3600
+        self.http_cache_max_size = 1024 * 1024 * 1024  # bytes
+        self.http_cache_directory = None  # defaults to settings.HTTP_CACHE_DIRECTORY
         self.proxies = {}
         self.number_threads = 10
+        self.max_connections_per_host = 4  # concurrent downloads per host, see download_articles()
+
+        # HTTP keep-alive connection pooling, see requests.adapters.HTTPAdapter
+        self.pool_connections = 10  # num of per host connection pools to cache
+        self.pool_maxsize = 10  # max num of connections kept alive per host
+        self.pool_block = False  # block instead of opening extra connections when a pool is full
+        self.max_retries = 2  # retries of failed connections and 502/503/504 responses
+        self.retry_backoff_factor = 0.3  # seconds, doubled on every retry
+
+        # results of Article.nlp(), the spaCy components other results
+        # need are not loaded: 'keywords', 'summary', 'dates' or 'full',
+        # several of them separated by commas, see language_models.py.
+        # Only profiles with 'full' fill in the title of pages without one
+        self.nlp_profile = 'full'
+        # when the page has no publishing date Article.nlp() takes the first
+        # date entity of the text, parsed by dateparser with these settings,
+        # see named_entity_recognition.parse_date(). Without date entities
+        # the whole text is searched for dates, which is slow on long texts
+        self.date_parser_settings = None
+        self.extract_text_dates = True
 
         self.verbose = False  # for debugging
+        # Article.timings of the outermost stages also hold a cProfile
+        # report and the peak of memory allocated, both slow stages down
+        self.profile_stages = False
+        self.trace_memory = False
 
         self.thread_timeout_seconds = 1
         self.ignored_content_types_defaults = {}
@@ -10,6 +10,7 @@ lxml or soup parsing code in the parser.py file!
 import copy
 import logging
 import re
+import string
 from collections import defaultdict
 from urllib.parse import urljoin, urlparse, urlunparse
 
@@ -43,7 +44,12 @@ NO_STRINGS = set()
 A_REL_TAG_SELECTOR = "a[rel=tag]"
 A_HREF_TAG_SELECTOR = ("a[href*='/tag/'], a[href*='/tags/'], "
                        "a[href*='/topic/'], a[href*='?keyword=']")
+A_HREF_TAG_PATHS = ('/tag/', '/tags/', '/topic/', '?keyword=')
 RE_LANG = r'^[A-Za-z]{2}$'
+RE_META_SELECTOR = re.compile(r'^meta\[([\w:-]+)=["\']?([^"\'\]]*)["\']?\]$')
+
+# ascii only lowercasing, same as the translate() of Parser.get_elements_by_tag
+ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
 
 good_paths = ['story', 'article', 'feature', 'featured', 'slides',
               'slideshow', 'gallery', 'news', 'video', 'media',
@@ -54,12 +60,91 @@ bad_chunks = ['careers', 'contact', 'about', 'faq', 'terms', 'privacy',
 bad_domains = ['amazon', 'doubleclick', 'twitter']
 
 
+class DocumentIndex(object):
+    """Walks a document once and buckets the nodes the metadata extractors
+    look for, so each extractor is a lookup instead of a walk of the tree.
+    Only valid as long as the document is not mutated
+    """
+    TAGS = ('title', 'h1', 'meta', 'link', 'a')
+    ATTRIBUTES = ('property', 'name', 'rel', 'itemprop', 'class', 'id',
+                  'pubdate', 'http-equiv')
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.tags = defaultdict(list)
+        # attribute -> [(ascii lowercased value, element)] in document order
+        self.attributes = defaultdict(list)
+        # (attribute, value) -> <meta> elements, for exact css style lookups
+        self.metas = defaultdict(list)
+        self._found = {}
+
+        for element in doc.iter():
+            tag = element.tag
+            if not isinstance(tag, str):
+                # comments and processing instructions
+                continue
+            if tag in self.TAGS:
+                self.tags[tag].append(element)
+            attrib = element.attrib
+            if not attrib:
+                continue
+            for attr in self.ATTRIBUTES:
+                value = attrib.get(attr)
+                if value is not None:
+                    self.attributes[attr].append((value.translate(ASCII_LOWER), element))
+            if tag == 'meta':
+                for attr, value in attrib.items():
+                    self.metas[(attr, value)].append(element)
+
+    def find(self, attr, values, tag=None):
+        """Elements whose `attr` contains one of `values`, ignoring ascii
+        case, like Parser.get_elements_by_tag(doc, tag, attr, value)
+        """
+        if isinstance(values, str):
+            values = (values,)
+        key = (attr, tuple(values), tag)
+        if key not in self._found:
+            values = [value.lower() for value in values]
+            self._found[key] = [
+                element for lowered, element in self.attributes[attr]
+                if (tag is None or element.tag == tag) and
+                any(value in lowered for value in values)]
+        return self._found[key]
+
+    def meta(self, attr, value):
+        """<meta> elements whose `attr` is exactly `value`, like the css
+        selector meta[attr="value"]
+        """
+        return self.metas.get((attr, value), [])
+
+
 class ContentExtractor(object):
     def __init__(self, config):
         self.config = config
         self.parser = self.config.get_parser()
         self.language = config.language
         self.stopwords_class = config.stopwords_class
+        self._index = None
+        self._stopwords = None
+        # node -> text and node -> WordStats of the document being scored
+        self._node_texts = {}
+        self._node_word_stats = {}
+        # node -> gravity score and node -> number of decent nodes under it
+        self.gravity_scores = {}
+        self.gravity_nodes = {}
+
+    def get_index(self, doc):
+        """The DocumentIndex of `doc`, built on first use and kept until
+        another document is passed in or `release_index()` is called
+        """
+        if self._index is None or self._index.doc is not doc:
+            self._index = DocumentIndex(doc)
+        return self._index
+
+    def release_index(self):
+        """Must be called before the indexed document is mutated
+        """
+        self._index = None
 
     def update_language(self, meta_lang):
         """Required to be called before the extraction process in some
@@ -70,6 +155,38 @@ class ContentExtractor(object):
             self.language = meta_lang
             self.stopwords_class = \
                 self.config.get_stopwords_class(meta_lang)
+            self._stopwords = None
+            self._node_word_stats = {}
+
+    def get_stopwords(self):
+        if self._stopwords is None:
+            self._stopwords = self.stopwords_class.for_language(self.language)
+        return self._stopwords
+
+    def get_node_text(self, node):
+        """Parser.get_text(node), computed once per node of the document
+        being scored
+        """
+        text = self._node_texts.get(node)
+        if text is None:
+            text = self._node_texts[node] = self.parser.get_text(node)
+        return text
+
+    def get_word_stats(self, node):
+        """The WordStats of the text of `node`, each node is tokenized once
+        per document being scored
+        """
+        word_stats = self._node_word_stats.get(node)
+        if word_stats is None:
+            word_stats = self._node_word_stats[node] = \
+                self.get_stopwords().get_stopword_count(self.get_node_text(node))
+        return word_stats
+
+    def release_node_cache(self):
+        """Must be called before the scored nodes are mutated
+        """
+        self._node_texts = {}
+        self._node_word_stats = {}
 
     def get_authors(self, doc):
         """Fetch the authors of the article, return as a list
@@ -153,12 +270,13 @@ class ContentExtractor(object):
         matches = []
         authors = []
 
+        index = self.get_index(doc)
+        seen = set()
         for attr in ATTRS:
             for val in VALS:
-                # found = doc.xpath('//*[@%s="%s"]' % (attr, val))
-                elements = self.parser.get_elements_by_tag(doc, attr=attr, value=val)
-                for element in elements:
-                    if element not in matches:
+                for element in index.find(attr, val):
+                    if element not in seen:
+                        seen.add(element)
                         matches.append(element)
 
         TAGS = ['meta', 'div', 'iframe', 'a', 'span', 'section']
@@ -232,11 +350,9 @@ class ContentExtractor(object):
             {'attribute': 'name', 'value': 'cXenseParse:recs:publishtime',
              'content': 'content'},
         ]
+        index = self.get_index(doc)
         for known_meta_tag in PUBLISH_DATE_TAGS:
-            meta_tags = self.parser.get_elements_by_tag(
-                doc,
-                attr=known_meta_tag['attribute'],
-                value=known_meta_tag['value'])
+            meta_tags = index.find(known_meta_tag['attribute'], known_meta_tag['value'])
             if meta_tags:
                 date_str = self.parser.get_attribute(
                     meta_tags[0],
@@ -265,7 +381,8 @@ class ContentExtractor(object):
         5. use title, after splitting
         """
         title = ''
-        title_element = self.parser.get_elements_by_tag(doc, tag='title')
+        index = self.get_index(doc)
+        title_element = index.tags['title']
         # no title found
         if title_element is None or len(title_element) == 0:
             return title
@@ -279,8 +396,7 @@ class ContentExtractor(object):
         # - too short texts (fewer than 2 words) are discarded
         # - clean double spaces
         title_text_h1 = ''
-        title_element_h1_list = self.parser.get_elements_by_tag(doc,
-                                                                tag='h1') or []
+        title_element_h1_list = index.tags['h1']
         title_text_h1_list = [self.parser.get_text(tag) for tag in
                               title_element_h1_list]
         if title_text_h1_list:
@@ -393,8 +509,7 @@ class ContentExtractor(object):
         <link rel="shortcut icon" type="image/png" href="favicon.png" />
         <link rel="icon" type="image/png" href="favicon.png" />
         """
-        kwargs = {'tag': 'link', 'attr': 'rel', 'value': 'icon'}
-        meta = self.parser.get_elements_by_tag(doc, **kwargs)
+        meta = self.get_index(doc).find('rel', 'icon', tag='link')
         if meta:
             favicon = self.parser.get_attribute(meta[0], 'href')
             return favicon
@@ -407,13 +522,10 @@ class ContentExtractor(object):
         attr = self.parser.get_attribute(doc, attr='lang')
         if attr is None:
             # look up for a Content-Language in meta
-            items = [
-                {'tag': 'meta', 'attr': 'http-equiv',
-                 'value': 'content-language'},
-                {'tag': 'meta', 'attr': 'name', 'value': 'lang'}
-            ]
-            for item in items:
-                meta = self.parser.get_elements_by_tag(doc, **item)
+            items = [('http-equiv', 'content-language'), ('name', 'lang')]
+            index = self.get_index(doc)
+            for item_attr, item_value in items:
+                meta = index.find(item_attr, item_value, tag='meta')
                 if meta:
                     attr = self.parser.get_attribute(
                         meta[0], attr='content')
@@ -432,7 +544,11 @@ class ContentExtractor(object):
             "meta[name=keywords]"
             "meta[property=og:type]"
         """
-        meta = self.parser.css_select(doc, metaname)
+        match = RE_META_SELECTOR.match(metaname)
+        if match:
+            meta = self.get_index(doc).meta(*match.groups())
+        else:
+            meta = self.parser.css_select(doc, metaname)
         content = None
         if meta is not None and len(meta) > 0:
             content = self.parser.get_attribute(meta[0], 'content')
@@ -446,17 +562,14 @@ class ContentExtractor(object):
         top_meta_image, try_one, try_two, try_three, try_four = [None] * 5
         try_one = self.get_meta_content(doc, 'meta[property="og:image"]')
         if not try_one:
-            link_img_src_kwargs = \
-                {'tag': 'link', 'attr': 'rel', 'value': 'img_src|image_src'}
-            elems = self.parser.get_elements_by_tag(doc, use_regex=True, **link_img_src_kwargs)
+            elems = self.get_index(doc).find('rel', ('img_src', 'image_src'), tag='link')
             try_two = elems[0].get('href') if elems else None
 
             if not try_two:
                 try_three = self.get_meta_content(doc, 'meta[name="og:image"]')
 
                 if not try_three:
-                    link_icon_kwargs = {'tag': 'link', 'attr': 'rel', 'value': 'icon'}
-                    elems = self.parser.get_elements_by_tag(doc, **link_icon_kwargs)
+                    elems = self.get_index(doc).find('rel', 'icon', tag='link')
                     try_four = elems[0].get('href') if elems else None
 
         top_meta_image = try_one or try_two or try_three or try_four
@@ -491,7 +604,7 @@ class ContentExtractor(object):
 
     def get_meta_data(self, doc):
         data = defaultdict(dict)
-        properties = self.parser.css_select(doc, 'meta')
+        properties = self.get_index(doc).tags['meta']
         for prop in properties:
             key = prop.attrib.get('property') or prop.attrib.get('name')
             value = prop.attrib.get('content') or prop.attrib.get('value')
@@ -536,8 +649,7 @@ class ContentExtractor(object):
         1. The rel=canonical tag
         2. The og:url tag
         """
-        links = self.parser.get_elements_by_tag(doc, tag='link', attr='rel',
-                                                value='canonical')
+        links = self.get_index(doc).find('rel', 'canonical', tag='link')
 
         canonical = self.parser.get_attribute(links[0], 'href') if links else ''
         og_url = self.get_meta_content(doc, 'meta[property="og:url"]')
@@ -592,11 +704,12 @@ class ContentExtractor(object):
     def extract_tags(self, doc):
         if len(list(doc)) == 0:
             return NO_STRINGS
-        elements = self.parser.css_select(
-            doc, A_REL_TAG_SELECTOR)
+        # same as the A_REL_TAG_SELECTOR and A_HREF_TAG_SELECTOR css selectors
+        anchors = self.get_index(doc).tags['a']
+        elements = [a for a in anchors if a.get('rel') == 'tag']
         if not elements:
-            elements = self.parser.css_select(
-                doc, A_HREF_TAG_SELECTOR)
+            elements = [a for a in anchors
+                        if any(path in a.get('href', '') for path in A_HREF_TAG_PATHS)]
             if not elements:
                 return NO_STRINGS
 
@@ -608,18 +721,21 @@ class ContentExtractor(object):
         return set(tags)
 
     def calculate_best_node(self, doc, html):
+        self.release_node_cache()
+        self.release_gravity_scores()
         nodes_to_check = self.nodes_to_check(doc)
         if not nodes_to_check:
             nodes_to_check = self.nodes_to_check_soap(html)
         starting_boost = float(1.0)
         cnt = 0
-        parent_nodes = []
+        # used as an ordered set, ties go to the first parent scored
+        parent_nodes = {}
         nodes_with_text = []
 
         for node in nodes_to_check:
-            text_node = self.parser.get_text(node)
+            text_node = self.get_node_text(node)
             if text_node:
-                word_stats = self.stopwords_class(language=self.language).get_stopword_count(text_node)
+                word_stats = self.get_word_stats(node)
                 high_link_density = self.is_highlink_density(node)
                 if word_stats.get_stopword_count() > 2 and not high_link_density:
                     nodes_with_text.append(node)
@@ -647,25 +763,21 @@ class ContentExtractor(object):
                     if negscore > 40:
                         boost_score = float(5)
 
-            text_node = self.parser.get_text(node)
-            word_stats = self.stopwords_class(language=self.language). \
-                get_stopword_count(text_node)
+            word_stats = self.get_word_stats(node)
             upscore = int(word_stats.get_stopword_count() + boost_score)
 
             parent_node = self.parser.get_parent(node)
             self.update_score(parent_node, upscore)
             self.update_node_count(parent_node, 1)
 
-            if parent_node not in parent_nodes:
-                parent_nodes.append(parent_node)
+            parent_nodes[parent_node] = None
 
             # Parent of parent node
             parent_parent_node = self.parser.get_parent(parent_node)
             if parent_parent_node is not None:
                 self.update_node_count(parent_parent_node, 1)
                 self.update_score(parent_parent_node, upscore / 2)
-                if parent_parent_node not in parent_nodes:
-                    parent_nodes.append(parent_parent_node)
+                parent_nodes[parent_parent_node] = None
             cnt += 1
             i += 1
 
@@ -690,9 +802,7 @@ class ContentExtractor(object):
             if current_node_tag == para:
                 if steps_away >= max_stepsaway_from_node:
                     return False
-                paragraph_text = self.parser.get_text(current_node)
-                word_stats = self.stopwords_class(language=self.language). \
-                    get_stopword_count(paragraph_text)
+                word_stats = self.get_word_stats(current_node)
                 if word_stats.get_stopword_count() > minimum_stopword_count:
                     return True
                 steps_away += 1
@@ -716,7 +826,7 @@ class ContentExtractor(object):
         """Adds any siblings that may have a decent score to this node
         """
         if current_sibling.tag == 'p' and \
-                len(self.parser.get_text(current_sibling)) > 0:
+                len(self.get_node_text(current_sibling)) > 0:
             e0 = current_sibling
             if e0.tail:
                 e0 = copy.deepcopy(e0)
@@ -730,11 +840,9 @@ class ContentExtractor(object):
             else:
                 ps = []
                 for first_paragraph in potential_paragraphs:
-                    text = self.parser.get_text(first_paragraph)
+                    text = self.get_node_text(first_paragraph)
                     if len(text) > 0:
-                        word_stats = self.stopwords_class(
-                            language=self.language). \
-                            get_stopword_count(text)
+                        word_stats = self.get_word_stats(first_paragraph)
                         paragraph_score = word_stats.get_stopword_count()
                         sibling_baseline_score = float(.30)
                         high_link_density = self.is_highlink_density(
@@ -761,9 +869,7 @@ class ContentExtractor(object):
         nodes_to_check = self.parser.get_elements_by_tag(top_node, tag='p')
 
         for node in nodes_to_check:
-            text_node = self.parser.get_text(node)
-            word_stats = self.stopwords_class(language=self.language). \
-                get_stopword_count(text_node)
+            word_stats = self.get_word_stats(node)
             high_link_density = self.is_highlink_density(node)
             if word_stats.get_stopword_count() > 2 and not high_link_density:
                 paragraphs_number += 1
@@ -775,28 +881,28 @@ class ContentExtractor(object):
         return base
 
     def update_score(self, node, add_to_score):
-        """Adds a score to the gravityScore Attribute we put on divs
-        we'll get the current score then add the score we're passing
-        in to the current.
+        """Adds a score to the gravity score of a node, kept in
+        `gravity_scores` rather than on the DOM
         """
-        current_score = 0
-        score_string = self.parser.get_attribute(node, 'gravityScore')
-        if score_string:
-            current_score = float(score_string)
-
-        new_score = current_score + add_to_score
-        self.parser.set_attribute(node, "gravityScore", str(new_score))
+        self.gravity_scores[node] = self.gravity_scores.get(node, 0) + add_to_score
 
     def update_node_count(self, node, add_to_count):
         """Stores how many decent nodes are under a parent node
         """
-        current_score = 0
-        count_string = self.parser.get_attribute(node, 'gravityNodes')
-        if count_string:
-            current_score = int(count_string)
+        self.gravity_nodes[node] = self.gravity_nodes.get(node, 0) + add_to_count
 
-        new_score = current_score + add_to_count
-        self.parser.set_attribute(node, "gravityNodes", str(new_score))
+    def release_gravity_scores(self):
+        self.gravity_scores = {}
+        self.gravity_nodes = {}
+
+    def set_gravity_attributes(self):
+        """Writes the scores out as the gravityScore and gravityNodes
+        attributes of the scored nodes, for callers inspecting the DOM
+        """
+        for node, score in self.gravity_scores.items():
+            self.parser.set_attribute(node, 'gravityScore', str(float(score)))
+        for node, count in self.gravity_nodes.items():
+            self.parser.set_attribute(node, 'gravityNodes', str(count))
 
     def is_highlink_density(self, e):
         """Checks the density of links within a node, if there is a high
@@ -806,14 +912,14 @@ class ContentExtractor(object):
         if not links:
             return False
 
-        text = self.parser.get_text(e)
+        text = self.get_node_text(e)
         words = [word for word in text.split() if word.isalnum()]
         if not words:
             return True
         words_number = float(len(words))
         sb = []
         for link in links:
-            sb.append(self.parser.get_text(link))
+            sb.append(self.get_node_text(link))
 
         link_text = ''.join(sb)
         link_words = link_text.split()
@@ -832,10 +938,7 @@ class ContentExtractor(object):
         return self.get_node_gravity_score(node) or 0
 
     def get_node_gravity_score(self, node):
-        gravity_score = self.parser.get_attribute(node, 'gravityScore')
-        if not gravity_score:
-            return None
-        return float(gravity_score)
+        return self.gravity_scores.get(node)
 
     def nodes_to_check(self, doc):
         """Returns a list of nodes we want to search
@@ -878,4 +981,6 @@ class ContentExtractor(object):
             if e_tag != 'p':
                 if self.is_highlink_density(e):
                     self.parser.remove(e)
+        # the output formatter mutates the nodes from here on
+        self.release_node_cache()
         return node
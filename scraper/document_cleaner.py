@@ -4,6 +4,8 @@ Holds the code for cleaning out unwanted tags from the lxml
 dom xpath.
 """
 import copy
+import re
+from collections import defaultdict
 
 from .utils import ReplaceSequence
 
@@ -15,6 +17,10 @@ __maintainer__ = "The Stimson Center"
 __maintainer_email = "cooper@pobox.com"
 
 
+DROPCAP_CLASSES = {'dropcap', 'drop_cap'}
+XML_WHITESPACE = re.compile('[ \t\r\n]+')
+
+
 class DocumentCleaner(object):
 
     def __init__(self, config):
@@ -61,27 +67,110 @@ class DocumentCleaner(object):
         self.contains_article = './/article|.//*[@id="article"]|.//*[@itemprop="articleBody"]'
 
     def clean(self, doc_to_clean):
-        """Remove chunks of the DOM as specified
+        """Remove chunks of the DOM as specified. Same result as running
+        clean_body_classes() through div_to_para() one after the other,
+        but the nodes they remove are found in a single walk of the tree
         """
-        doc_to_clean = self.clean_body_classes(doc_to_clean)
-        doc_to_clean = self.clean_article_tags(doc_to_clean)
-        doc_to_clean = self.clean_em_tags(doc_to_clean)
-        doc_to_clean = self.remove_drop_caps(doc_to_clean)
-        doc_to_clean = self.remove_scripts_styles(doc_to_clean)
-        doc_to_clean = self.clean_bad_tags(doc_to_clean)
-        doc_to_clean = self.remove_nodes_regex(doc_to_clean, self.caption_re)
-        doc_to_clean = self.remove_nodes_regex(doc_to_clean, self.google_re)
-        doc_to_clean = self.remove_nodes_regex(doc_to_clean, self.entries_re)
-        doc_to_clean = self.remove_nodes_regex(doc_to_clean, self.facebook_re)
-        doc_to_clean = self.remove_nodes_regex(doc_to_clean,
-                                               self.facebook_broadcasting_re)
-        doc_to_clean = self.remove_nodes_regex(doc_to_clean, self.twitter_re)
+        nodes = self.find_nodes_to_clean(doc_to_clean)
+
+        for node in nodes['em']:
+            self.parser.drop_tag(node)
+        for node in nodes['dropcap']:
+            self.parser.drop_tag(node)
+        for tag in ('script', 'style', 'comment'):
+            for node in nodes[tag]:
+                self.parser.remove(node)
+
+        # removed in the same order as by clean_bad_tags() and then
+        # remove_nodes_regex(), which decides where the tails of removed
+        # nodes end up and which nodes still contain an article
+        for attr in ['id', 'class', 'name']:
+            for node in nodes['naughty', attr]:
+                if self.parser.is_in_tree(node, doc_to_clean) and \
+                        not node.xpath(self.contains_article) and \
+                        (attr != 'class' or node.get('itemprop') != 'articleBody'):
+                    self.parser.remove(node)
+        for pattern in self.get_remove_patterns():
+            for attr in ['id', 'class']:
+                for node in nodes[pattern, attr]:
+                    if self.parser.is_in_tree(node, doc_to_clean):
+                        self.parser.remove(node)
+
         doc_to_clean = self.clean_para_spans(doc_to_clean)
         doc_to_clean = self.div_to_para(doc_to_clean, 'div')
         doc_to_clean = self.div_to_para(doc_to_clean, 'span')
         doc_to_clean = self.div_to_para(doc_to_clean, 'section')
         return doc_to_clean
 
+    def get_remove_patterns(self):
+        """Patterns removed by remove_nodes_regex() in clean(), in order
+        """
+        return [self.caption_re, self.google_re, self.entries_re, self.facebook_re,
+                self.facebook_broadcasting_re, self.twitter_re]
+
+    def find_nodes_to_clean(self, doc):
+        """Walks the tree once, applying clean_body_classes() and
+        clean_article_tags() on the way, and returns the nodes every other
+        step of clean() up to clean_para_spans() acts on, by step, in
+        document order. The re:test() xpath functions of those steps are
+        Python's re.search(), so precompiled regexes match the same nodes
+        """
+        nodes = defaultdict(list)
+        naughty_re = re.compile(self.remove_nodes_re, re.IGNORECASE)
+        patterns = [(pattern, re.compile(pattern, re.IGNORECASE))
+                    for pattern in self.get_remove_patterns()]
+        # one alternation to rule out most nodes before testing each pattern
+        any_pattern_re = re.compile('|'.join('(?:%s)' % pattern for pattern, _ in patterns),
+                                    re.IGNORECASE)
+        body_cleaned = False
+        ems = []
+
+        for node in doc.iter():
+            tag = node.tag
+            if not isinstance(tag, str):
+                if self.parser.is_comment(node):
+                    nodes['comment'].append(node)
+                continue
+            if tag == 'script' or tag == 'style':
+                nodes[tag].append(node)
+                continue
+            if tag == 'body' and node is not doc and not body_cleaned:
+                self.parser.delete_attribute(node, attr='class')
+                body_cleaned = True
+            elif tag == 'article' and node is not doc:
+                for attr in ['id', 'name', 'class']:
+                    self.parser.delete_attribute(node, attr=attr)
+            elif tag == 'em' and node is not doc:
+                ems.append(node)
+            elif tag == 'span' and DROPCAP_CLASSES.intersection(
+                    XML_WHITESPACE.split(node.get('class', ''))):
+                nodes['dropcap'].append(node)
+                continue
+
+            attrib = node.attrib
+            for attr in ['id', 'class', 'name']:
+                value = attrib.get(attr)
+                if value is None:
+                    continue
+                if naughty_re.search(value):
+                    nodes['naughty', attr].append(node)
+                if attr != 'name' and any_pattern_re.search(value):
+                    for pattern, pattern_re in patterns:
+                        if pattern_re.search(value):
+                            nodes[pattern, attr].append(node)
+
+        # ems holding images are kept, the others are dropped before
+        # the regexes are tested and so are never removed by them
+        for node in ems:
+            if not self.parser.get_elements_by_tag(node, tag='img'):
+                nodes['em'].append(node)
+        if nodes['em']:
+            dropped = set(nodes['em'])
+            for key, key_nodes in nodes.items():
+                if key != 'em':
+                    nodes[key] = [node for node in key_nodes if node not in dropped]
+        return nodes
+
     def clean_body_classes(self, doc):
         """Removes the `class` attribute from the <body> tag because
         if there is a bad match, the entire DOM will be empty!
@@ -163,7 +252,21 @@ class DocumentCleaner(object):
 
     # noinspection PyUnusedLocal
     def get_flushed_buffer(self, replacement_text, doc):
-        return self.parser.text_to_para(replacement_text)
+        """`replacement_text` holds text and copies of the links next to it,
+        the element is built from them directly unless only parsing their
+        html is sure to give the same result
+        """
+        para = self.parser.fragment_to_para(replacement_text)
+        if para is None:
+            para = self.parser.text_to_para(''.join(
+                piece if isinstance(piece, str) else self.parser.outer_html(piece)
+                for piece in replacement_text))
+        return para
+
+    def copy_without_tail(self, node):
+        node = copy.deepcopy(node)
+        node.tail = None
+        return node
 
     def replace_walk_left_right(self, kid, kid_text,
                                 replacement_text, nodes_to_remove):
@@ -174,8 +277,7 @@ class DocumentCleaner(object):
             while prev_node is not None \
                     and self.parser.get_tag(prev_node) == "a" \
                     and self.parser.get_attribute(prev_node, 'grv-usedalready') != 'yes':
-                outer = " " + self.parser.outer_html(prev_node) + " "
-                replacement_text.append(outer)
+                replacement_text.extend([" ", self.copy_without_tail(prev_node), " "])
                 nodes_to_remove.append(prev_node)
                 self.parser.set_attribute(prev_node, attr='grv-usedalready',
                                           value='yes')
@@ -186,8 +288,7 @@ class DocumentCleaner(object):
             while next_node is not None \
                     and self.parser.get_tag(next_node) == "a" \
                     and self.parser.get_attribute(next_node, 'grv-usedalready') != 'yes':
-                outer = " " + self.parser.outer_html(next_node) + " "
-                replacement_text.append(outer)
+                replacement_text.extend([" ", self.copy_without_tail(next_node), " "])
                 nodes_to_remove.append(next_node)
                 self.parser.set_attribute(next_node, attr='grv-usedalready',
                                           value='yes')
@@ -201,8 +302,7 @@ class DocumentCleaner(object):
         for kid in kids:
             # The node is a <p> and already has some replacement text
             if self.parser.get_tag(kid) == 'p' and len(replacement_text) > 0:
-                new_node = self.get_flushed_buffer(
-                    ''.join(replacement_text), doc)
+                new_node = self.get_flushed_buffer(replacement_text, doc)
                 nodes_to_return.append(new_node)
                 replacement_text = []
                 nodes_to_return.append(kid)
@@ -216,7 +316,7 @@ class DocumentCleaner(object):
 
         # flush out anything still remaining
         if len(replacement_text) > 0:
-            new_node = self.get_flushed_buffer(''.join(replacement_text), doc)
+            new_node = self.get_flushed_buffer(replacement_text, doc)
             nodes_to_return.append(new_node)
             # noinspection PyUnusedLocal
             replacement_text = []
@@ -234,12 +334,20 @@ class DocumentCleaner(object):
     def div_to_para(self, doc, dom_type):
         bad_divs = 0
         else_divs = 0
-        divs = self.parser.get_elements_by_tag(doc, tag=dom_type)
+        divs = [div for div in doc.iter(dom_type) if div is not doc]
         tags = ['a', 'blockquote', 'dl', 'div', 'img', 'ol', 'p',
                 'pre', 'table', 'ul']
+        # converting or rebuilding a div never changes what its descendants
+        # contain, so the flags of the whole tree can be found up front,
+        # marking the ancestors of every block up to one already marked
+        has_blocks = set()
+        for block in doc.iter(*tags):
+            for ancestor in block.iterancestors():
+                if ancestor in has_blocks:
+                    break
+                has_blocks.add(ancestor)
         for div in divs:
-            items = self.parser.get_elements_by_tags(div, tags)
-            if div is not None and len(items) == 0:
+            if div is not None and div not in has_blocks:
                 self.replace_with_para(doc, div)
                 bad_divs += 1
             elif div is not None:
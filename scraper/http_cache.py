@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent cache of downloaded responses, so crawling the same pages
+again only revalidates them with conditional requests. Every response
+is a file named after the hash of its normalized url, holding a line of
+JSON with its url, status, headers and fetch time followed by the raw
+body. The least recently used files are deleted once the cache grows
+past its max size.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from . import settings
+
+__title__ = 'stimson-web-scraper'
+__author__ = 'Lucas Ou-Yang'
+__license__ = 'MIT'
+__copyright__ = 'Copyright 2014, Lucas Ou-Yang'
+__maintainer__ = "The Stimson Center"
+__maintainer_email = "cooper@pobox.com"
+
+log = logging.getLogger(__name__)
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+RE_MAX_AGE = re.compile(r'max-age\s*=\s*"?(\d+)', re.IGNORECASE)
+# headers of a 304 response which replace the cached ones
+REVALIDATED_HEADERS = ('cache-control', 'date', 'etag', 'expires', 'last-modified')
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def normalize_url(url):
+    """Lowercases the scheme and host and drops default ports and
+    fragments, which don't change what the server returns
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc = '%s:%s' % (netloc, parts.port)
+    if parts.username:
+        netloc = '%s@%s' % (parts.username if parts.password is None else
+                            '%s:%s' % (parts.username, parts.password), netloc)
+    return urlunsplit((scheme, netloc, parts.path or '/', parts.query, ''))
+
+
+def get_max_age(headers):
+    """Seconds the response may be used without revalidation according to
+    its Cache-Control header, None if it doesn't say
+    """
+    cache_control = headers.get('cache-control', '')
+    if 'no-cache' in cache_control.lower():
+        return 0
+    max_age = RE_MAX_AGE.search(cache_control)
+    return int(max_age.group(1)) if max_age else None
+
+
+def is_cacheable(response):
+    return response.status_code == 200 and \
+        'no-store' not in response.headers.get('cache-control', '').lower()
+
+
+class CacheEntry(object):
+    """A cached response body with its headers, the time it was last
+    fetched or revalidated and its kind of content, see
+    network.sniff_content()
+    """
+
+    def __init__(self, url, headers, content, content_kind, fetched=None):
+        self.url = url
+        self.headers = dict(headers)
+        self.content = content
+        self.content_kind = content_kind
+        self.fetched = fetched or time.time()
+
+    def is_fresh(self, ttl):
+        """`ttl` is the default time to live in seconds, when the response
+        has no Cache-Control max-age
+        """
+        max_age = get_max_age(CaseInsensitiveDict(self.headers))
+        ttl = ttl if max_age is None else max_age
+        return time.time() - self.fetched < ttl
+
+    def conditional_headers(self):
+        """Request headers asking the server to answer 304 Not Modified if
+        the cached response is still valid
+        """
+        headers = CaseInsensitiveDict(self.headers)
+        conditions = {}
+        if headers.get('etag'):
+            conditions['If-None-Match'] = headers['etag']
+        if headers.get('last-modified'):
+            conditions['If-Modified-Since'] = headers['last-modified']
+        return conditions
+
+    def revalidated(self, response):
+        """Takes the validators and freshness of a 304 `response`
+        """
+        headers = CaseInsensitiveDict(self.headers)
+        for name in REVALIDATED_HEADERS:
+            if name in response.headers:
+                headers[name] = response.headers[name]
+        self.headers = dict(headers)
+        self.fetched = time.time()
+
+    def to_bytes(self):
+        metadata = {'url': self.url, 'status': 200, 'headers': self.headers,
+                    'content_kind': self.content_kind, 'fetched': self.fetched}
+        # json.dumps escapes line breaks, the first line holds all of it
+        return json.dumps(metadata).encode('utf-8') + b'\n' + self.content
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Raises ValueError if `data` is not a cache entry
+        """
+        metadata, _, content = data.partition(b'\n')
+        metadata = json.loads(metadata.decode('utf-8'))
+        try:
+            return cls(metadata['url'], metadata['headers'], content, metadata['content_kind'],
+                       metadata['fetched'])
+        except (KeyError, TypeError) as ex:
+            raise ValueError('not a cache entry: %s' % ex)
+
+    def to_response(self):
+        """A requests.Response holding the cached body, decoded like the
+        response it was stored from
+        """
+        response = requests.Response()
+        response.status_code = 200
+        response.url = self.url
+        response.headers = CaseInsensitiveDict(self.headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = self.content
+        return response
+
+
+class HttpCache(object):
+    """Thread safe cache of CacheEntry files in `directory`, at most
+    `max_size` bytes of them. Only this user may access the directory,
+    PermissionError is raised if it belongs to another user
+    """
+
+    def __init__(self, directory=settings.HTTP_CACHE_DIRECTORY, max_size=None):
+        self.directory = directory
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._size = None
+        settings.ensure_private_directory(directory)
+
+    def path(self, url):
+        key = hashlib.sha1(normalize_url(url).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key)
+
+    def get(self, url):
+        path = self.path(url)
+        try:
+            with open(path, 'rb') as f:
+                entry = CacheEntry.from_bytes(f.read())
+            # the modification time orders the entries for eviction
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as ex:
+            log.warning('dropping unreadable cache entry of %s: %s' % (url, ex))
+            self.remove(url)
+            return None
+        return entry
+
+    def put(self, url, entry):
+        path = self.path(url)
+        data = entry.to_bytes()
+        # written aside and moved in place, readers never see part of an entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            try:
+                replaced = os.path.getsize(path)
+            except OSError:
+                replaced = 0
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        with self._lock:
+            if self._size is not None:
+                self._size += len(data) - replaced
+            self._evict()
+
+    def remove(self, url):
+        try:
+            os.remove(self.path(url))
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self._size = None
+
+    def clear(self):
+        with self._lock:
+            for name in os.listdir(self.directory):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+            self._size = 0
+
+    def size(self):
+        with self._lock:
+            return sum(size for mtime, size, path in self._entries())
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.startswith('.'):
+                # being written
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                # removed by another process meanwhile
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self):
+        """Deletes the least recently used entries while the cache is too
+        big, the directory is only listed when it may be
+        """
+        if not self.max_size or (self._size is not None and self._size <= self.max_size):
+            return
+        entries = self._entries()
+        self._size = sum(size for mtime, size, path in entries)
+        for mtime, size, path in sorted(entries):
+            if self._size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self._size -= size
+
+
+def get_http_cache(config):
+    """Returns the process wide HttpCache for the cache settings of `config`,
+    None if its directory can't be used
+    """
+    directory = config.http_cache_directory or settings.HTTP_CACHE_DIRECTORY
+    key = (directory, config.http_cache_max_size)
+    with _caches_lock:
+        if key not in _caches:
+            try:
+                _caches[key] = HttpCache(directory, config.http_cache_max_size)
+            except OSError as ex:
+                log.warning('not caching http responses: %s' % ex)
+                _caches[key] = None
+        return _caches[key]
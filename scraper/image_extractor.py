@@ -11,8 +11,8 @@ import traceback
 import urllib.parse
 
 import requests
-from PIL import Image, ImageFile
 
+from . import network
 from . import urls
 
 __title__ = 'stimson-web-scraper'
@@ -37,6 +37,7 @@ def image_to_str(image):
 
 
 def str_to_image(s):
+    from PIL import Image
     s = io.StringIO(s)
     s.seek(0)
     image = Image.open(s)
@@ -44,6 +45,7 @@ def str_to_image(s):
 
 
 def prepare_image(image):
+    from PIL import Image
     image = square_image(image)
     image.thumbnail(thumbnail_size, Image.ANTIALIAS)
     return image
@@ -86,18 +88,19 @@ def clean_url(url):
     return url
 
 
-def fetch_url(url, useragent, referer=None, retries=1, dimension=False):
+def fetch_url(url, useragent, referer=None, retries=1, dimension=False, session=None):
     cur_try = 0
     nothing = None if dimension else (None, None)
     url = clean_url(url)
     if not url.startswith(('http://', 'https://')):
         return nothing
+    session = session or network.get_session()
 
     response = None
     while True:
         # noinspection PyUnusedLocal,PyUnusedLocal
         try:
-            response = requests.get(url, stream=True, timeout=5, headers={
+            response = session.get(url, stream=True, timeout=5, headers={
                 'User-Agent': useragent,
                 'Referer': referer,
             })
@@ -115,6 +118,7 @@ def fetch_url(url, useragent, referer=None, retries=1, dimension=False):
                 return nothing
 
             if 'image' in content_type:
+                from PIL import ImageFile
                 p = ImageFile.Parser()
                 new_data = content
                 while not p.image and new_data:
@@ -162,13 +166,13 @@ def fetch_url(url, useragent, referer=None, retries=1, dimension=False):
                 return nothing
         finally:
             if response is not None:
-                response.raw.close()
-                if response.raw._connection:
-                    response.raw._connection.close()
+                # hands the connection back to the session's pool, urllib3
+                # discards it instead if the body was only partially read
+                response.close()
 
 
-def fetch_image_dimension(url, useragent, referer=None, retries=1):
-    return fetch_url(url, useragent, referer, retries, dimension=True)
+def fetch_image_dimension(url, useragent, referer=None, retries=1, session=None):
+    return fetch_url(url, useragent, referer, retries, dimension=True, session=session)
 
 
 class ImageExtractor:
@@ -179,6 +183,7 @@ class ImageExtractor:
         self.top_img = article.top_img
         self.config = article.config
         self.useragent = self.config.browser_user_agent
+        self.session = network.get_session(self.config)
 
     def largest_image_url(self):
         # TODO: remove. it is not responsibility of Scrapper
@@ -191,7 +196,7 @@ class ImageExtractor:
         max_url = None
         for img_url in self.imgs:
             dimension = fetch_image_dimension(
-                img_url, self.useragent, referer=self.url)
+                img_url, self.useragent, referer=self.url, session=self.session)
             area = self.calculate_area(img_url, dimension)
             if area > max_area:
                 max_area = area
@@ -225,7 +230,7 @@ class ImageExtractor:
 
     def satisfies_requirements(self, img_url):
         dimension = fetch_image_dimension(
-            img_url, self.useragent, referer=self.url)
+            img_url, self.useragent, referer=self.url, session=self.session)
         area = self.calculate_area(img_url, dimension)
         return area > minimal_area
 
@@ -235,7 +240,7 @@ class ImageExtractor:
         image_url = self.largest_image_url()
         if image_url:
             useragent = self.config.browser_user_agent
-            content_type, image_str = fetch_url(image_url, useragent, referer=self.url)
+            content_type, image_str = fetch_url(image_url, useragent, referer=self.url, session=self.session)
             if image_str:
                 image = str_to_image(image_str)
                 try:
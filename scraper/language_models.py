@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+Process wide registry of assembled spaCy + PyTextRank pipelines.
+
+Loading a spaCy model is by far the most expensive step of `Article.nlp()`,
+so every pipeline is built once per process per language and reused by
+every article afterwards. The least recently used pipelines are evicted
+so a multilingual worker does not hold every model in memory at once.
+Pipelines are built for an NLP profile, which leaves out the components
+the results of the profile don't need.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+
+import pytextrank
+import spacy
+
+from . import settings
+
+__title__ = 'stimson-web-scraper'
+__author__ = 'Lucas Ou-Yang'
+__license__ = 'MIT'
+__copyright__ = 'Copyright 2014, Lucas Ou-Yang'
+__maintainer__ = "The Stimson Center"
+__maintainer_email = "cooper@pobox.com"
+
+log = logging.getLogger(__name__)
+
+# https://spacy.io/usage/models
+SPACY_LANGUAGE_MODELS = {
+    "zh": "zh_core_web_sm",  # Chinese
+    "da": "da_core_news_sm",  # Danish
+    "nl": "nl_core_news_sm",  # Dutch
+    "en": "en_core_web_sm",  # English
+    "fr": "fr_core_news_sm",  # French
+    "de": "de_core_news_sm",  # German
+    "el": "el_core_news_sm",  # Greek
+    "it": "it_core_news_sm",  # Italian
+    "ja": "ja_core_news_sm",  # Japanese
+    "lt": "lt_core_news_sm",  # Lithuanian
+    "nb": "nb_core_news_sm",  # Norwegian Bokmål
+    "pl": "pl_core_news_sm",  # Polish
+    "pt": "pt_core_news_sm",  # Portuguese
+    "ro": "ro_core_news_sm",  # Romanian
+    "es": "es_core_news_sm"  # Spanish
+}
+
+# Multi-language model used for every language without a dedicated model
+MULTI_LANGUAGE_MODEL = "xx_ent_wiki_sm"
+
+# results of Article.nlp() -> the pipeline components they need, the
+# `sentences` are set by the parser or else by a sentencizer
+NLP_RESULT_COMPONENTS = {
+    'keywords': {'tagger', 'sentences'},
+    'summary': {'sentences'},
+    # title from the top phrase when the page has none, PyTextRank
+    # phrases are built from noun chunks
+    'title': {'tagger', 'parser', 'textrank'},
+    'dates': {'ner'},
+}
+
+# NLP profile -> the results Article.nlp() sets with it
+NLP_PROFILES = {
+    'keywords': frozenset(['keywords']),
+    'summary': frozenset(['summary']),
+    'dates': frozenset(['dates']),
+    'full': frozenset(NLP_RESULT_COMPONENTS),
+}
+FULL_PROFILE = 'full'
+# spaCy components which may be left out at load time
+OPTIONAL_COMPONENTS = ('tagger', 'parser', 'ner')
+# spaCy 2 and PyTextRank 2 add pipeline components as objects, spaCy 3
+# and PyTextRank 3 by the name of their registered factory
+SPACY_V2 = int(spacy.__version__.split('.')[0]) < 3
+
+
+def get_profile_results(profile):
+    """Results of the NLP `profile`, a name of NLP_PROFILES or several
+    separated by commas, e.g. "keywords,dates"
+    """
+    results = set()
+    for name in profile.split(','):
+        name = name.strip()
+        if name not in NLP_PROFILES:
+            raise ValueError('unknown NLP profile %r, expected one of %s' % (name, ', '.join(sorted(NLP_PROFILES))))
+        results |= NLP_PROFILES[name]
+    return frozenset(results)
+
+
+def normalize_profile(profile):
+    """Canonical name of the NLP `profile`, 'full' or the names of its
+    results sorted and separated by commas, so equivalent profiles share a
+    pipeline
+    """
+    results = get_profile_results(profile)
+    if results == NLP_PROFILES[FULL_PROFILE]:
+        return FULL_PROFILE
+    return ','.join(sorted(results))
+
+
+def get_profile_components(profile):
+    components = set()
+    for result in get_profile_results(profile):
+        components |= NLP_RESULT_COMPONENTS[result]
+    return components
+
+
+def build_pipeline(language_code, profile=FULL_PROFILE):
+    """Loads the spaCy model for `language_code` without the components the
+    NLP `profile` doesn't need, and adds PyTextRank to the end of it if
+    needed. THIS STEP CAN TAKE A MINUTE OR TWO
+    """
+    components = get_profile_components(profile)
+    unneeded = [name for name in OPTIONAL_COMPONENTS if name not in components]
+    # https://github.com/huggingface/neuralcoref/issues/117
+    model = SPACY_LANGUAGE_MODELS.get(language_code, MULTI_LANGUAGE_MODEL)
+    if SPACY_V2:
+        nlp = spacy.load(model, disable=unneeded)
+    else:
+        # excluded components are not even loaded
+        nlp = spacy.load(model, exclude=unneeded)
+    if 'parser' not in nlp.pipe_names:
+        if SPACY_V2:
+            nlp.add_pipe(nlp.create_pipe('sentencizer'))
+        else:
+            nlp.add_pipe('sentencizer')
+    if 'textrank' in components:
+        # add PyTextRank to the spaCy pipeline
+        if SPACY_V2:
+            tr = pytextrank.TextRank()
+            nlp.add_pipe(tr.PipelineComponent, name="textrank", last=True)
+        else:
+            nlp.add_pipe('textrank', last=True)
+    return nlp
+
+
+class PipelineRegistry(object):
+    """Thread safe LRU cache of (language code, NLP profile) -> assembled
+    spaCy pipeline
+    """
+
+    def __init__(self, max_size=settings.MAX_NLP_PIPELINES):
+        self.max_size = max_size
+        self._pipelines = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_locks = {}
+
+    def get(self, language_code, profile=FULL_PROFILE):
+        key = (language_code[0:2], normalize_profile(profile))
+        with self._lock:
+            if key in self._pipelines:
+                self._pipelines.move_to_end(key)
+                return self._pipelines[key]
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        # only one thread builds a given pipeline, other pipelines are not blocked
+        with build_lock:
+            with self._lock:
+                if key in self._pipelines:
+                    self._pipelines.move_to_end(key)
+                    return self._pipelines[key]
+            log.debug('loading spaCy pipeline for %s, profile %s' % key)
+            nlp = build_pipeline(*key)
+            with self._lock:
+                self._pipelines[key] = nlp
+                self._evict()
+            return nlp
+
+    def warm(self, language_codes, profile=FULL_PROFILE):
+        """Builds the pipelines of `language_codes` ahead of time, e.g. at
+        worker startup
+        """
+        for language_code in language_codes:
+            self.get(language_code, profile)
+
+    def resize(self, max_size):
+        with self._lock:
+            self.max_size = max_size
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._pipelines.clear()
+
+    def languages(self):
+        with self._lock:
+            return list(OrderedDict.fromkeys(language_code for language_code, profile in self._pipelines))
+
+    def __contains__(self, language_code):
+        with self._lock:
+            return any(key[0] == language_code[0:2] for key in self._pipelines)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pipelines)
+
+    def _evict(self):
+        while self.max_size and len(self._pipelines) > self.max_size:
+            key, nlp = self._pipelines.popitem(last=False)
+            log.debug('evicting spaCy pipeline for %s, profile %s' % key)
+
+
+pipelines = PipelineRegistry()
+
+
+def get_pipeline(language_code, profile=FULL_PROFILE):
+    """Returns the cached spaCy pipeline for `language_code` and the NLP
+    `profile`
+    """
+    return pipelines.get(language_code, profile)
+
+
+def warm_pipelines(language_codes, profile=FULL_PROFILE):
+    pipelines.warm(language_codes, profile)
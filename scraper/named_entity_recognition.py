@@ -1,4 +1,7 @@
+import functools
 import re
+import threading
+import weakref
 from collections import OrderedDict
 
 import dateparser
@@ -7,6 +10,75 @@ from date_extractor import extract_dates
 from spacy.lang.en.stop_words import STOP_WORDS
 from spacy.matcher import Matcher
 
+from .utils import clear_stale_date_caches, daily_date_cache
+
+DEFAULT_STOP_WORDS = frozenset(STOP_WORDS)
+
+# pipeline -> {stopwords: DEFAULT_STOP_WORDS and stopwords}, for the
+# stopwords already marked in the vocab of the pipeline
+_marked_stopwords = weakref.WeakKeyDictionary()
+_marked_stopwords_lock = threading.Lock()
+
+
+def mark_stopwords(nlp, stopwords=()):
+    """Marks spaCy's default STOP_WORDS and `stopwords` as stop words in the
+    vocab of the pipeline `nlp`, once per pipeline and set of stopwords, so
+    articles analyzed with the same pipeline don't write to its shared vocab
+    again. Returns the frozenset of all the stop words
+    """
+    stopwords = stopwords if isinstance(stopwords, frozenset) else frozenset(stopwords)
+    with _marked_stopwords_lock:
+        marked = _marked_stopwords.setdefault(nlp, {})
+        all_stopwords = marked.get(stopwords)
+        if all_stopwords is None:
+            all_stopwords = DEFAULT_STOP_WORDS.union(stopwords)
+            already_marked = frozenset().union(*marked.values())
+            for word in all_stopwords - already_marked:
+                nlp.vocab[word].is_stop = True
+            marked[stopwords] = all_stopwords
+    return all_stopwords
+
+
+def parse_date(text, language=None, date_settings=None):
+    """The datetime of the date string `text` according to dateparser, None
+    if it is not a date. `language` spares dateparser from detecting the
+    language and `date_settings` are dateparser settings, e.g.
+    {'PREFER_DATES_FROM': 'past'}. Relative dates like "last week" are
+    cached for the day only, unless `date_settings` has a RELATIVE_BASE
+    """
+    today = clear_stale_date_caches()
+    date_settings = date_settings or {}
+    language = get_date_language(language)
+    # lists of settings, e.g. PARSERS, are frozen into tuples for the key
+    key = tuple(sorted((name, tuple(value) if isinstance(value, list) else value)
+                       for name, value in date_settings.items()))
+    try:
+        hash(key)
+    except TypeError:
+        # settings with other unhashable values are not cached
+        return dateparser.parse(text, languages=[language] if language else None, settings=date_settings or None)
+    day = None if 'RELATIVE_BASE' in date_settings else today
+    return _parse_date(text, language, key, day)
+
+
+@functools.lru_cache(maxsize=None)
+def get_date_language(language):
+    """`language` if dateparser knows it, else None, e.g. for 'xx'
+    """
+    if not language:
+        return None
+    try:
+        dateparser.parse('', languages=[language])
+    except ValueError:
+        return None
+    return language
+
+
+@daily_date_cache
+def _parse_date(text, language, date_settings, day):
+    date_settings = {name: list(value) if isinstance(value, tuple) else value for name, value in date_settings}
+    return dateparser.parse(text, languages=[language] if language else None, settings=date_settings or None)
+
 
 # https://gist.github.com/BrambleXu/3d47bbdbd1ee4e6fc695b0ddb88cbf99
 # https://spacy.io/usage/linguistic-features
@@ -23,16 +95,13 @@ class TextRank4Keyword:
         self.steps = 10  # iteration steps
         self.node_weight = None  # save keywords and its weight
         self.doc = None
-        self.stopwords = STOP_WORDS
+        self.stopwords = DEFAULT_STOP_WORDS
 
     def set_stopwords(self, stopwords):
         """
-        Set stop words
+        Set stop words, see mark_stopwords()
         """
-        self.stopwords = self.stopwords.union(set(stopwords))
-        for word in self.stopwords:
-            lexeme = self.nlp.vocab[word]
-            lexeme.is_stop = True
+        self.stopwords = mark_stopwords(self.nlp, stopwords)
 
     def sentence_segment(self, candidate_pos, lower):
         """
@@ -43,7 +112,7 @@ class TextRank4Keyword:
             selected_words = []
             for token in sent:
                 # Store words only with cadidate POS tag
-                if token.pos_ in candidate_pos and token.is_stop is False:
+                if token.pos_ in candidate_pos and not token.is_stop and token.lower_ not in self.stopwords:
                     if lower is True:
                         selected_words.append(token.text.lower())
                     else:
@@ -68,16 +137,12 @@ class TextRank4Keyword:
         """
         Build token_pairs from windows in sentences
         """
-        token_pairs = list()
+        token_pairs = OrderedDict()
         for sentence in sentences:
             for i, word in enumerate(sentence):
-                for j in range(i + 1, i + window_size):
-                    if j >= len(sentence):
-                        break
-                    pair = (word, sentence[j])
-                    if pair not in token_pairs:
-                        token_pairs.append(pair)
-        return token_pairs
+                for j in range(i + 1, min(i + window_size, len(sentence))):
+                    token_pairs[(word, sentence[j])] = True
+        return list(token_pairs)
 
     @staticmethod
     def symmetrize(a):
@@ -90,16 +155,16 @@ class TextRank4Keyword:
         # Build matrix
         vocab_size = len(vocab)
         g = np.zeros((vocab_size, vocab_size), dtype='float')
-        for word1, word2 in token_pairs:
-            i, j = vocab[word1], vocab[word2]
-            g[i][j] = 1
+        if token_pairs:
+            rows, cols = zip(*[(vocab[word1], vocab[word2]) for word1, word2 in token_pairs])
+            g[list(rows), list(cols)] = 1
 
         # Get Symmeric matrix
         g = self.symmetrize(g)
 
         # Normalize matrix by column
         norm = np.sum(g, axis=0)
-        g_norm = np.divide(g, norm, where=norm != 0)  # this is ignore the 0 element in norm
+        g_norm = np.divide(g, norm, out=np.zeros_like(g), where=norm != 0)  # this is ignore the 0 element in norm
 
         return g_norm
 
@@ -133,17 +198,19 @@ class TextRank4Keyword:
             sentences.append(s)
         return sentences
 
-    def get_dates(self):
+    def get_dates(self, extract_from_text=True, date_settings=None):
+        """
+        Dates of the DATE entities, or else those extract_dates() finds in
+        the whole text unless not `extract_from_text`, see parse_date()
+        """
         # https://spacy.io/usage/linguistic-features#101
         ents = [ent for ent in self.doc.ents if ent.label_ == 'DATE']
-        for ent in self.doc.ents:
-            if ent.label_ == "01/04/1937":
-                pass
+        language = getattr(self.nlp, 'lang', None)
         dates = list()
         for ent in ents:
-            date = dateparser.parse(ent.text)
+            date = parse_date(ent.text, language, date_settings)
             dates.append(date)
-        if not dates:
+        if not dates and extract_from_text:
             extracted_dates = extract_dates(self.doc.text)
             dates += extracted_dates
         return dates
@@ -197,7 +264,7 @@ class TextRank4Keyword:
                 education.append(key)
         return education
 
-    def analyze(self, text, candidate_pos=None, window_size=4, lower=False, stopwords=None):
+    def analyze(self, text, candidate_pos=None, window_size=4, lower=False, stopwords=None, keywords=True):
         """
         Main function to analyze text
         """
@@ -205,12 +272,23 @@ class TextRank4Keyword:
         # Set stop words
         if stopwords is None:
             stopwords = list()
-        if candidate_pos is None:
-            candidate_pos = ['NOUN', 'PROPN']
         self.set_stopwords(stopwords)
 
         # Pare text by spaCy
-        self.doc = self.nlp(text)
+        self.analyze_doc(self.nlp(text), candidate_pos=candidate_pos, window_size=window_size, lower=lower,
+                         keywords=keywords)
+
+    def analyze_doc(self, doc, candidate_pos=None, window_size=4, lower=False, keywords=True):
+        """
+        Analyze a document already parsed by spaCy, e.g. one yielded by nlp.pipe().
+        Without `keywords` the words are not ranked, only the document is kept
+        """
+        if candidate_pos is None:
+            candidate_pos = ['NOUN', 'PROPN']
+        self.doc = doc
+        if not keywords:
+            self.node_weight = dict()
+            return
 
         # Filter sentences
         sentences = self.sentence_segment(candidate_pos, lower)  # list of list of words
@@ -218,23 +296,8 @@ class TextRank4Keyword:
         # Build vocabulary
         vocab = self.get_vocab(sentences)
 
-        # Get token_pairs from windows
-        token_pairs = self.get_token_pairs(window_size, sentences)
-
-        # Get normalized matrix
-        g = self.get_matrix(vocab, token_pairs)
-
-        # Initialization for weight(pagerank value)
-        pr = np.array([1] * len(vocab))
-
-        # Iteration
-        previous_pr = 0
-        for epoch in range(self.steps):
-            pr = (1 - self.d) + self.d * np.dot(g, pr)
-            if abs(previous_pr - sum(pr)) < self.min_diff:
-                break
-            else:
-                previous_pr = sum(pr)
+        # Rank the words of the co-occurrence graph
+        pr = rank_words(vocab, sentences, window_size, self.d, self.steps, self.min_diff)
 
         # Get weight for each node
         node_weight = dict()
@@ -242,3 +305,48 @@ class TextRank4Keyword:
             node_weight[word] = pr[index]
 
         self.node_weight = node_weight
+
+
+def get_edges(vocab, sentences, window_size):
+    """Edges of the co-occurrence graph of the words of `sentences`, words
+    are linked when they are less than `window_size` words apart in a
+    sentence. Returns the `rows`, `cols` and `weights` of the non zero
+    cells of the symmetric adjacency matrix normalized by column, the
+    sparse equivalent of TextRank4Keyword.get_matrix()
+    """
+    vocab_size = len(vocab)
+    words = np.fromiter((vocab[word] for sentence in sentences for word in sentence), dtype=np.int64)
+    sentence_ids = np.repeat(np.arange(len(sentences)), [len(sentence) for sentence in sentences])
+    pairs = []
+    for offset in range(1, window_size):
+        same_sentence = sentence_ids[:-offset] == sentence_ids[offset:]
+        pairs.append(words[:-offset][same_sentence] * vocab_size + words[offset:][same_sentence])
+    # each (word1, word2) pair counts once, however often it occurs
+    pairs = np.unique(np.concatenate(pairs)) if pairs else np.zeros(0, dtype=np.int64)
+    rows, cols = pairs // vocab_size, pairs % vocab_size
+
+    # symmetrize, a cell is 2 if both (i, j) and (j, i) occur, the diagonal stays 1
+    loops = rows == cols
+    rows, cols = np.concatenate([rows, cols[~loops]]), np.concatenate([cols, rows[~loops]])
+    cells, weights = np.unique(rows * vocab_size + cols, return_counts=True)
+    rows, cols = cells // vocab_size, cells % vocab_size
+    weights = weights.astype(float)
+
+    # normalize by column
+    norm = np.bincount(cols, weights=weights, minlength=vocab_size)
+    return rows, cols, weights / norm[cols]
+
+
+def rank_words(vocab, sentences, window_size=4, d=0.85, steps=10, min_diff=1e-5):
+    """PageRank of the words of the co-occurrence graph, see get_edges(),
+    iterated at most `steps` times and until the ranks change by less than
+    `min_diff` in total. Returns the ranks indexed like `vocab`
+    """
+    rows, cols, weights = get_edges(vocab, sentences, window_size)
+    pr = np.ones(len(vocab))
+    for epoch in range(steps):
+        previous_pr = pr
+        pr = (1 - d) + d * np.bincount(rows, weights=weights * previous_pr[cols], minlength=len(vocab))
+        if np.abs(pr - previous_pr).sum() < min_diff:
+            break
+    return pr
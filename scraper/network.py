@@ -4,18 +4,24 @@ All code involving requests and responses over the http network
 must be abstracted in this file.
 """
 
+import asyncio
+import codecs
 import logging
-import tempfile
-from http.cookiejar import CookieJar as cj
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
 
-import PyPDF4
-import pdftotext
 import requests
+from requests.adapters import HTTPAdapter
 from requests_toolbelt.utils import deprecated
+from urllib3.util.retry import Retry
 
 # This site doesn’t like and want scraping. This gives you the same dreaded error 54,
 # connection reset by the peer.
 from .configuration import Configuration
+from .http_cache import CacheEntry, get_http_cache, is_cacheable
+from .pdf import LazyPdfFileReader, get_pdf_text
 
 __title__ = 'stimson-web-scraper'
 __author__ = 'Lucas Ou-Yang'
@@ -27,6 +33,37 @@ __maintainer_email = "cooper@pobox.com"
 log = logging.getLogger(__name__)
 
 FAIL_ENCODING = 'ISO-8859-1'
+RETRY_STATUS_CODES = (502, 503, 504)
+
+# kinds of response bodies, see sniff_content()
+TEXT_CONTENT = 'text'
+PDF_CONTENT = 'pdf'
+BINARY_CONTENT = 'binary'
+
+PDF_PREFIX = b'%PDF-'
+# leading bytes of the common non text files linked from news pages
+BINARY_SIGNATURES = (
+    b'\x89PNG', b'\xff\xd8\xff', b'GIF87a', b'GIF89a', b'BM', b'II*\x00', b'MM\x00*',
+    b'RIFF', b'OggS', b'fLaC', b'ID3', b'\x1aE\xdf\xa3', b'FLV', b'PK\x03\x04', b'\x1f\x8b',
+    b'BZh', b'\xfd7zXZ', b'7z\xbc\xaf', b'Rar!', b'\xd0\xcf\x11\xe0', b'\x7fELF', b'MZ',
+    b'wOFF', b'wOF2'
+)
+BINARY_MEDIA_TYPES = ('image/', 'audio/', 'video/', 'font/')
+
+
+class ResponseTooLarge(requests.exceptions.RequestException):
+    """The response body is bigger than `Configuration.max_download_size`
+    """
+
+
+class UnsupportedContent(requests.exceptions.RequestException):
+    """The response body is neither text nor PDF
+    """
+
+
+_adapters = {}
+_adapters_lock = threading.Lock()
+_thread_sessions = threading.local()
 
 
 def get_request_kwargs(timeout, useragent, proxies, headers):
@@ -35,13 +72,66 @@ def get_request_kwargs(timeout, useragent, proxies, headers):
     """
     return {
         'headers': headers if headers else {'User-Agent': useragent},
-        'cookies': cj(),
         'timeout': timeout,
         'allow_redirects': True,
         'proxies': proxies
     }
 
 
+def get_adapter(config):
+    """Returns the process wide HTTPAdapter for the pool settings of
+    `config`. The adapter owns the keep-alive connection pools and is
+    thread safe, so it is shared by every session with the same settings
+    """
+    key = (config.pool_connections, config.pool_maxsize, config.pool_block,
+           config.max_retries, config.retry_backoff_factor)
+    with _adapters_lock:
+        adapter = _adapters.get(key)
+        if adapter is None:
+            retries = Retry(total=config.max_retries,
+                            backoff_factor=config.retry_backoff_factor,
+                            status_forcelist=RETRY_STATUS_CODES,
+                            raise_on_status=False)
+            adapter = HTTPAdapter(pool_connections=config.pool_connections,
+                                  pool_maxsize=config.pool_maxsize,
+                                  pool_block=config.pool_block,
+                                  max_retries=retries)
+            _adapters[key] = adapter
+    return adapter
+
+
+class PooledSession(requests.Session):
+    """Session whose cookies only last for one request and its redirects,
+    like those of requests.get(), so the cookies of a site are never sent
+    along with the next requests of the thread
+    """
+
+    def request(self, *args, **kwargs):
+        try:
+            return super().request(*args, **kwargs)
+        finally:
+            self.cookies.clear()
+
+
+def get_session(config=None):
+    """Returns a PooledSession for the calling thread. Sessions are not
+    shared between threads, but all of them reuse the connections of the
+    adapter built for the pool settings of `config`
+    """
+    config = config or Configuration()
+    adapter = get_adapter(config)
+    sessions = getattr(_thread_sessions, 'sessions', None)
+    if sessions is None:
+        sessions = _thread_sessions.sessions = {}
+    session = sessions.get(id(adapter))
+    if session is None:
+        session = PooledSession()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        sessions[id(adapter)] = session
+    return session
+
+
 def get_html(url, config=None, response=None):
     """HTTP response code agnostic
     """
@@ -54,6 +144,8 @@ def get_html_2XX_only(url, config=None, response=None):
     - Attempt to find encoding of the html by using HTTP header. Fallback to
       'ISO-8859-1' if not provided.
     - Error out if a non 2XX HTTP response code is returned.
+    - Error out if the body is bigger than `config.max_download_size` or is
+      neither text nor PDF, without downloading the rest of it.
     """
     config = config or Configuration()
     useragent = config.browser_user_agent
@@ -61,32 +153,97 @@ def get_html_2XX_only(url, config=None, response=None):
     proxies = config.proxies
     headers = config.headers
     pdf_file_reader = None
-    pdf_prefix = '%PDF-'
 
     if response is not None:
         return _get_html_from_response(response, config), pdf_file_reader
 
-    response = requests.get(url=url, **get_request_kwargs(timeout, useragent, proxies, headers))
+    cache = get_http_cache(config) if config.use_http_cache else None
+    entry = cache.get(url) if cache is not None else None
+    if entry is not None and entry.is_fresh(config.http_cache_ttl):
+        return _get_html_and_pdf(entry.to_response(), entry.content_kind, config)
 
-    html = _get_html_from_response(response, config)
+    request_kwargs = get_request_kwargs(timeout, useragent, proxies, headers)
+    if entry is not None:
+        request_kwargs['headers'] = dict(request_kwargs['headers'], **entry.conditional_headers())
 
-    if response.status_code != 200 and config.http_success_only:
-        # fail if HTTP sends a non 2XX response
-        response.raise_for_status()
+    session = get_session(config)
+    with session.get(url=url, stream=True, **request_kwargs) as response:
+        if response.status_code == 304 and entry is not None:
+            # not modified since cached
+            entry.revalidated(response)
+            cache.put(url, entry)
+            return _get_html_and_pdf(entry.to_response(), entry.content_kind, config)
+        if response.status_code != 200 and config.http_success_only:
+            # fail if HTTP sends a non 2XX response, before reading its body
+            response.raise_for_status()
+        if response.headers.get('content-type') in config.ignored_content_types_defaults:
+            return _get_html_from_response(response, config), pdf_file_reader
+        content_kind = read_content(response, config)
 
-    if html.startswith(pdf_prefix) and html != pdf_prefix:
-        html = ""
-        pdf_file = tempfile.TemporaryFile(mode='wb+')
-        pdf_file.write(response.content)
-        pdf_file.flush()
-        pdf_file.seek(0)
-        pagesAsListOfText = pdftotext.PDF(pdf_file)
-        for text in pagesAsListOfText:
-            html += text
-        pdf_file.seek(0)
-        pdf_file_reader = PyPDF4.PdfFileReader(pdf_file)
+    if cache is not None and is_cacheable(response):
+        cache.put(url, CacheEntry(response.url, response.headers, response.content, content_kind))
+    return _get_html_and_pdf(response, content_kind, config)
 
-    return html, pdf_file_reader
+
+def _get_html_and_pdf(response, content_kind, config):
+    """Text of the read `response` and, for PDF documents, their reader
+    """
+    if content_kind != PDF_CONTENT:
+        return _get_html_from_response(response, config), None
+    html = get_pdf_text(response.content, config.max_pdf_pages, config.pdf_processes)
+    return html, LazyPdfFileReader(response.content)
+
+
+def sniff_content(chunk, content_type=None):
+    """Tells from the first bytes of a response body and its content-type
+    header whether it is TEXT_CONTENT, PDF_CONTENT or BINARY_CONTENT
+    """
+    if chunk.startswith(PDF_PREFIX):
+        return PDF_CONTENT
+    if chunk.startswith(BINARY_SIGNATURES):
+        return BINARY_CONTENT
+    content_type = (content_type or '').lower()
+    if content_type.startswith(BINARY_MEDIA_TYPES):
+        return BINARY_CONTENT
+    if b'\x00' in chunk and 'utf-16' not in content_type and 'utf-32' not in content_type \
+            and not chunk.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return BINARY_CONTENT
+    return TEXT_CONTENT
+
+
+def read_content(response, config):
+    """Reads the body of the streamed `response` a chunk at a time into
+    `response.content`. Raises ResponseTooLarge as soon as the body grows
+    past `config.max_download_size` and UnsupportedContent if its first
+    chunk is binary. Returns the kind of content, see sniff_content()
+    """
+    max_size = config.max_download_size
+    content_length = response.headers.get('content-length', '')
+    if max_size and content_length.isdigit() and int(content_length) > max_size:
+        raise ResponseTooLarge('%s is %s bytes, more than the max_download_size of %s' %
+                               (response.url, content_length, max_size), response=response)
+    chunks, size, content_kind = [], 0, None
+    # bodies are decompressed while read, the size limit applies to what ends up in memory
+    for chunk in response.iter_content(chunk_size=config.download_chunk_size):
+        if not chunk:
+            continue
+        if content_kind is None:
+            content_kind = sniff_content(chunk, response.headers.get('content-type'))
+            if content_kind == BINARY_CONTENT:
+                raise UnsupportedContent('%s is not text nor PDF (%s)' %
+                                         (response.url, response.headers.get('content-type')),
+                                         response=response)
+        size += len(chunk)
+        if max_size and size > max_size:
+            raise ResponseTooLarge('%s is more than the max_download_size of %s bytes' %
+                                   (response.url, max_size), response=response)
+        chunks.append(chunk)
+    # `text` and `content` are then decoded as if requests had read the body itself
+    response._content = b''.join(chunks)
+    if content_kind == PDF_CONTENT and len(response._content) == len(PDF_PREFIX):
+        # nothing but the prefix, decoded as text like before
+        content_kind = TEXT_CONTENT
+    return content_kind or TEXT_CONTENT
 
 
 def _get_html_from_response(response, config):
@@ -116,19 +273,72 @@ class MRequest(object):
 
     def __init__(self, url, config=None):
         self.url = url
-        self.config = config
-        config = config or Configuration()
+        self.config = config = config or Configuration()
         self.useragent = config.browser_user_agent
         self.timeout = config.request_timeout
         self.proxies = config.proxies
         self.headers = config.headers
         self.resp = None
+        self.html = None
+        self.pdf_file_reader = None
+        self.exception = None
 
     def send(self):
         try:
-            self.resp = requests.get(self.url, **get_request_kwargs(
+            self.resp = get_session(self.config).get(self.url, **get_request_kwargs(
                 self.timeout, self.useragent, self.proxies, self.headers))
             if self.config.http_success_only:
                 self.resp.raise_for_status()
         except requests.exceptions.RequestException as e:
+            self.exception = e
+            log.critical('[REQUEST FAILED] ' + str(e))
+
+    def send_html(self):
+        """Like send() but decodes the body like get_html_2XX_only(),
+        including the text of PDF documents
+        """
+        # noinspection PyBroadException
+        try:
+            self.html, self.pdf_file_reader = get_html_2XX_only(self.url, self.config)
+        except Exception as e:
+            self.exception = e
             log.critical('[REQUEST FAILED] ' + str(e))
+
+
+async def send_all(mrequests, config=None):
+    """Sends `mrequests` concurrently from an asyncio event loop. At most
+    `config.number_threads` requests are in flight at once, and at most
+    `config.max_connections_per_host` of them to the same host, the
+    blocking sends run on a thread pool using the pooled sessions
+    """
+    config = config or Configuration()
+    loop = asyncio.get_running_loop()
+    connections = asyncio.Semaphore(config.number_threads)
+    host_connections = defaultdict(lambda: asyncio.Semaphore(config.max_connections_per_host))
+
+    async def send(mrequest):
+        async with connections, host_connections[urlparse(mrequest.url).netloc]:
+            await loop.run_in_executor(executor, mrequest.send_html)
+        return mrequest
+
+    with ThreadPoolExecutor(max_workers=config.number_threads) as executor:
+        return await asyncio.gather(*[send(mrequest) for mrequest in mrequests])
+
+
+def async_request(urls, config=None):
+    """Downloads `urls` concurrently, returns a list of MRequest objects in
+    the same order. Failed requests have their `exception` set and are
+    reported like MRequest.send() does
+    """
+    config = config or Configuration()
+    mrequests = [MRequest(url, config) for url in urls]
+    if not mrequests:
+        return mrequests
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(send_all(mrequests, config))
+    # called from a running event loop, e.g. in Jupyter or an async web
+    # app, where asyncio.run() refuses to start another one
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, send_all(mrequests, config)).result()
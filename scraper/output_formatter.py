@@ -17,6 +17,9 @@ __maintainer_email = "cooper@pobox.com"
 
 log = logging.getLogger(__name__)
 
+# tags which keep the nodes they are in from being removed as empty
+MEDIA_TAGS = ('object', 'embed', 'img')
+
 
 class OutputFormatter(object):
 
@@ -56,8 +59,8 @@ class OutputFormatter(object):
         self.add_newline_to_br()
         self.add_newline_to_li()
         self.replace_with_text()
-        self.remove_empty_tags()
-        self.remove_trailing_media_div()
+        depths = self.remove_empty_tags()
+        self.remove_trailing_media_div(depths)
         text = self.convert_to_text()
         # print(self.parser.node_to_string(self.get_top_node()))
         return text, html
@@ -124,48 +127,58 @@ class OutputFormatter(object):
 
     def remove_empty_tags(self):
         """It's common in top_node to exit tags that are filled with data
-        within properties but not within the tags themselves, delete them
+        within properties but not within the tags themselves, delete them.
+        Walks the top node once, children before their parent, and returns
+        the depth of every node left
+        """
+        top_node = self.get_top_node()
+        depths, has_text, has_media = {}, {}, {}
+        stack = [(top_node, False)]
+        while stack:
+            node, children_done = stack.pop()
+            if not children_done:
+                stack.append((node, True))
+                # the last child comes off the stack first
+                stack.extend((child, False) for child in node)
+                continue
+            if not isinstance(node.tag, str):
+                # comments and processing instructions
+                depths[node], has_text[node], has_media[node] = 1, False, False
+                continue
+            depth, text, media = 1, False, False
+            for child in node:
+                depth = max(depth, depths[child] + 1)
+                text = text or has_text[child] or bool(child.tail and child.tail.strip())
+                media = media or child.tag in MEDIA_TAGS or has_media[child]
+            # read after the children, removing them moves their tails here
+            text = text or bool(node.text and node.text.strip())
+            if node is not top_node and not text and not media and node.tag != 'img':
+                self.parser.remove(node)
+                continue
+            depths[node], has_text[node], has_media[node] = depth, text, media
+        return depths
+
+    def get_depth(self, node):
+        """Number of levels of the deepest branch under `node`, 1 for a
+        node without children
         """
-        all_nodes = self.parser.get_elements_by_tags(
-            self.get_top_node(), ['*'])
-        all_nodes.reverse()
-        for el in all_nodes:
-            tag = self.parser.get_tag(el)
-            text = self.parser.get_text(el)
-            if (tag != 'br' or text != '\\r') \
-                    and not text \
-                    and len(self.parser.get_elements_by_tag(
-                el, tag='object')) == 0 \
-                    and len(self.parser.get_elements_by_tag(
-                el, tag='embed')) == 0 \
-                    and len(self.parser.get_elements_by_tag(
-                el, tag='img')) == 0 \
-                    and tag not in {'img', }:
-                self.parser.remove(el)
-
-    def remove_trailing_media_div(self):
+        depth, stack = 1, [(node, 1)]
+        while stack:
+            node, node_depth = stack.pop()
+            depth = max(depth, node_depth)
+            stack.extend((child, node_depth + 1) for child in node)
+        return depth
+
+    def remove_trailing_media_div(self, depths=None):
         """Punish the *last top level* node in the top_node if it's
         DOM depth is too deep. Many media non-content links are
         eliminated: "related", "loading gallery", etc. It skips removal if
         last top level node's class is one of NON_MEDIA_CLASSES.
+        `depths` are the node depths returned by remove_empty_tags()
         """
 
         NON_MEDIA_CLASSES = ('zn-body__read-all',)
 
-        def get_depth(node, depth=1):
-            """Computes depth of an lxml element via BFS, this would be
-            in parser if it were used anywhere else besides this method
-            """
-            children = self.parser.get_children(node)
-            if not children:
-                return depth
-            max_depth = 0
-            for c in children:
-                e_depth = get_depth(c, depth + 1)
-                if e_depth > max_depth:
-                    max_depth = e_depth
-            return max_depth
-
         top_level_nodes = self.parser.get_children(self.get_top_node())
         if len(top_level_nodes) < 3:
             return
@@ -176,5 +189,6 @@ class OutputFormatter(object):
         if last_node_class in NON_MEDIA_CLASSES:
             return
 
-        if get_depth(last_node) >= 2:
+        depth = depths[last_node] if depths and last_node in depths else self.get_depth(last_node)
+        if depth >= 2:
             self.parser.remove(last_node)
@@ -15,6 +15,7 @@ from html import unescape
 import lxml.etree
 import lxml.html
 import lxml.html.clean
+import lxml.html.defs
 from bs4 import UnicodeDammit
 
 from .utils import innerTrim
@@ -28,6 +29,17 @@ allow_tags = [
     'ul', 'ol', 'li', 'dl', 'dt', 'dd'
 ]
 
+# tags whose nesting the html parser never changes, a fragment made only of
+# these serializes and parses back to the same elements
+PHRASING_TAGS = {
+    'a', 'abbr', 'b', 'bdo', 'big', 'br', 'cite', 'code', 'del', 'dfn', 'em',
+    'font', 'i', 'img', 'ins', 'kbd', 'mark', 'q', 's', 'samp', 'small',
+    'span', 'strike', 'strong', 'sub', 'sup', 'time', 'tt', 'u', 'var', 'wbr'
+}
+# text the html parser would read differently than it is written
+RE_UNSAFE_TEXT = re.compile('[<&\x00-\x08\x0b-\x1f\ufeff\ufffe\uffff]')
+HTML_WHITESPACE = ' \t\n\r'
+
 
 class Parser(object):
 
@@ -134,6 +146,55 @@ class Parser(object):
             elems.remove(node)
         return elems
 
+    @classmethod
+    def get_tables(cls, node, attributes=None):
+        """Returns the <table> elements under `node` whose attributes match
+        `attributes`, classes match if the table has the class among others
+        """
+        conditions = []
+        for attr, value in (attributes or {}).items():
+            if attr == 'class':
+                conditions.append('[contains(concat(" ", normalize-space(@class), " "), " %s ")]' % value)
+            else:
+                conditions.append('[@%s="%s"]' % (attr, value))
+        return node.xpath('descendant-or-self::table%s' % ''.join(conditions))
+
+    @classmethod
+    def table_to_rows(cls, table):
+        """Lays the cells of `table` out on a grid honoring their colspan
+        and rowspan, spanned cells repeat the text of the spanning cell
+        """
+        import numpy as np
+        rows = table.xpath('.//tr')
+        if not rows:
+            return []
+        rows_cells = [row.xpath('./td|./th') for row in rows]
+        nrows = len(rows)
+
+        def span(cell, attr, maximum):
+            digits = re.match(r'\s*(\d+)', cell.get(attr, ''))
+            value = int(digits.group(1)) if digits else 1
+            # rowspan="0" spans the remaining rows
+            return min(value, maximum) if value > 0 else maximum
+
+        spans = [[(span(cell, 'rowspan', nrows - i), span(cell, 'colspan', 1000)) for cell in cells]
+                 for i, cells in enumerate(rows_cells)]
+        # widest possible row, cells spanning rows from above push the others right
+        ncols = max(sum(c for r, c in row_spans) for row_spans in spans) + \
+            sum(c for row_spans in spans for r, c in row_spans if r > 1)
+        occupied = np.zeros((nrows, ncols), dtype=bool)
+        grid = np.full((nrows, ncols), '', dtype=object)
+        for i, cells in enumerate(rows_cells):
+            j = 0
+            for cell, (rspan, cspan) in zip(cells, spans[i]):
+                # shift to the first free column of this row
+                j += int(np.argmin(occupied[i, j:]))
+                occupied[i:i + rspan, j:j + cspan] = True
+                grid[i:i + rspan, j:j + cspan] = cell.text_content()
+                j += cspan
+        width = int(occupied.any(axis=0).nonzero()[0].max()) + 1 if occupied.any() else 0
+        return grid[:, :width].tolist()
+
     @classmethod
     def child_nodes_with_text(cls, node):
         root = node
@@ -163,6 +224,55 @@ class Parser(object):
     def text_to_para(cls, text):
         return cls.from_string(text)
 
+    @classmethod
+    def fragment_to_para(cls, pieces):
+        """Builds the element `text_to_para()` returns for the html of
+        `pieces`, a list of text and of elements without tails, but without
+        serializing and parsing them. Returns None when it can't be sure to
+        build the same element, e.g. the text has markup characters
+        """
+        para = lxml.html.HtmlElement()
+        para.tag = 'span'
+        texts = []
+        last = para
+        try:
+            for piece in pieces:
+                if isinstance(piece, str):
+                    if RE_UNSAFE_TEXT.search(piece):
+                        return None
+                    texts.append(piece)
+                    continue
+                for node in piece.iter():
+                    if node.tag not in PHRASING_TAGS:
+                        return None
+                    if node.tag in lxml.html.defs.block_tags:
+                        para.tag = 'div'
+                cls._set_text(last, texts, lstrip=last is para)
+                texts = []
+                para.append(piece)
+                last = piece
+            cls._set_text(last, texts, lstrip=last is para)
+        except ValueError:
+            # not XML compatible text, e.g. control characters
+            return None
+        if len(para) == 0 and para.text is None:
+            return None
+        if len(para) == 1 and not (para.text or '').strip(HTML_WHITESPACE) \
+                and not (para[0].tail or '').strip(HTML_WHITESPACE):
+            # a single element is returned as is
+            return para[0]
+        return para
+
+    @classmethod
+    def _set_text(cls, node, texts, lstrip=False):
+        text = ''.join(texts)
+        if lstrip:
+            # the parser drops whitespace before the content
+            text = text.lstrip(HTML_WHITESPACE)
+            node.text = text or None
+        else:
+            node.tail = text or None
+
     @classmethod
     def get_children(cls, node):
         return node.getchildren()
@@ -235,6 +345,20 @@ class Parser(object):
     def is_text_node(cls, node):
         return True if node.tag == 'text' else False
 
+    @classmethod
+    def is_comment(cls, node):
+        return node.tag is lxml.etree.Comment
+
+    @classmethod
+    def is_in_tree(cls, node, root):
+        """True if `node` was not removed from the tree of `root`
+        """
+        while node is not None:
+            if node is root:
+                return True
+            node = node.getparent()
+        return False
+
     @classmethod
     def get_attribute(cls, node, attr=None):
         if attr:
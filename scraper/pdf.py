@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Text and metadata of the PDF documents downloaded instead of html pages,
+read from the response body in memory.
+"""
+
+import io
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+from .utils import get_process_context
+
+__title__ = 'stimson-web-scraper'
+__author__ = 'Lucas Ou-Yang'
+__license__ = 'MIT'
+__copyright__ = 'Copyright 2014, Lucas Ou-Yang'
+__maintainer__ = "The Stimson Center"
+__maintainer_email = "cooper@pobox.com"
+
+log = logging.getLogger(__name__)
+
+# the workers of get_pdf_text() are started for the call and each parses
+# the whole document again, so documents are only split when every process
+# gets at least this many pages, shorter ones are extracted in the caller
+MIN_PAGES_PER_PROCESS = 20
+
+
+def get_pdf_text(content, max_pages=None, processes=1):
+    """Returns the text of the first `max_pages` pages of the PDF document
+    `content`, all of them if None. With more than one process the pages of
+    documents of at least 2 * MIN_PAGES_PER_PROCESS pages are split among a
+    process pool
+    """
+    import pdftotext
+    pdf = pdftotext.PDF(io.BytesIO(content))
+    pages = len(pdf) if max_pages is None else min(max_pages, len(pdf))
+    processes = min(processes or 1, pages // MIN_PAGES_PER_PROCESS)
+    if processes <= 1:
+        return ''.join(pdf[i] for i in range(pages))
+
+    bounds = [pages * i // processes for i in range(processes + 1)]
+    # called from the download threads, see get_process_context()
+    with ProcessPoolExecutor(max_workers=processes, mp_context=get_process_context()) as executor:
+        # map() yields the page ranges in order
+        return ''.join(executor.map(extract_pages, [content] * processes, bounds[:-1], bounds[1:]))
+
+
+def extract_pages(content, start, stop):
+    """Text of the pages `start` to `stop` of the PDF document `content`,
+    runs in the worker processes of get_pdf_text()
+    """
+    import pdftotext
+    pdf = pdftotext.PDF(io.BytesIO(content))
+    return ''.join(pdf[i] for i in range(start, stop))
+
+
+class LazyPdfFileReader(object):
+    """Stands in for the PyPDF4.PdfFileReader of a PDF document, which is
+    only built the first time one of its attributes is needed, e.g. its
+    `documentInfo` with the author and creation date
+    """
+
+    def __init__(self, content):
+        self.content = content
+        self._reader = None
+
+    @property
+    def reader(self):
+        if self._reader is None:
+            import PyPDF4
+            # BytesIO shares the buffer of `content` until written to
+            self._reader = PyPDF4.PdfFileReader(io.BytesIO(self.content))
+        return self._reader
+
+    def __getstate__(self):
+        # articles are sent between processes, the reader is built again
+        return {'content': self.content, '_reader': None}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.reader, name)
@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""
+Builds many articles at once by running download, parse and nlp as
+separate concurrent stages connected by bounded queues: I/O bound
+downloads on a thread pool, CPU bound parsing on a process pool and
+nlp on a dedicated process pool whose workers keep their spaCy
+pipelines loaded between articles.
+"""
+
+import logging
+import queue
+import threading
+from collections import defaultdict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from .article import Article, DOWNLOADED, PARSED
+from .configuration import Configuration
+from .utils import get_process_context
+
+__title__ = 'stimson-web-scraper'
+__author__ = 'Lucas Ou-Yang'
+__license__ = 'MIT'
+__copyright__ = 'Copyright 2014, Lucas Ou-Yang'
+__maintainer__ = "The Stimson Center"
+__maintainer_email = "cooper@pobox.com"
+
+log = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class Stage(object):
+    """One step of the pipeline. At most `max_pending` articles are in
+    flight or waiting for the next stage to pick them up, which is what
+    applies backpressure to the stages in front of it
+    """
+
+    def __init__(self, fn, executor, max_pending, stopped):
+        self.fn = fn
+        self.executor = executor
+        self.slots = threading.Semaphore(max_pending)
+        self.results = queue.Queue()
+        self.stopped = stopped
+        self._lock = threading.Lock()
+        # future -> the article submitted, passed on if the future fails
+        self._articles = {}
+        self._submitted = 0
+        self._completed = 0
+        self._closed = False
+
+    def submit(self, article):
+        """Blocks while the stage is full, returns False if the pipeline
+        was stopped meanwhile
+        """
+        while not self.slots.acquire(timeout=0.1):
+            if self.stopped.is_set():
+                return False
+        if self.stopped.is_set():
+            return False
+        with self._lock:
+            self._submitted += 1
+        try:
+            future = self.executor.submit(self.fn, article)
+        except RuntimeError as ex:
+            if self.stopped.is_set():
+                # the executor was shut down by the consumer stopping early
+                return False
+            # e.g. BrokenProcessPool, the article is passed on with the error
+            future = Future()
+            future.set_exception(ex)
+        with self._lock:
+            self._articles[future] = article
+        future.add_done_callback(self._done)
+        return True
+
+    def close(self):
+        """No more articles will be submitted
+        """
+        with self._lock:
+            self._closed = True
+            self._finish_if_done()
+
+    def _done(self, future):
+        self.results.put(future)
+        with self._lock:
+            self._completed += 1
+            self._finish_if_done()
+
+    def _finish_if_done(self):
+        if self._closed and self._completed == self._submitted:
+            self.results.put(_DONE)
+
+    def __iter__(self):
+        """Yields articles in the order they are finished
+        """
+        while True:
+            future = self.results.get()
+            if future is _DONE:
+                return
+            self.slots.release()
+            with self._lock:
+                article = self._articles.pop(future)
+            # noinspection PyBroadException
+            try:
+                article = future.result()
+            except Exception as ex:
+                # e.g. BrokenProcessPool when a worker process died
+                article.build_exception_msg = '%s: %s' % (type(ex).__name__, ex)
+                log.warning('%s of %s failed: %s' % (self.fn, article.url, article.build_exception_msg))
+            yield article
+
+
+class HostLimitedDownloader(object):
+    """Downloads articles, at most `max_connections_per_host` at a time
+    from the same host
+    """
+
+    def __init__(self, max_connections_per_host):
+        self._lock = threading.Lock()
+        self._host_slots = defaultdict(lambda: threading.Semaphore(max_connections_per_host))
+
+    def __call__(self, article):
+        with self._lock:
+            host_slots = self._host_slots[urlparse(article.url).netloc]
+        with host_slots:
+            # noinspection PyBroadException
+            try:
+                article.download()
+            except Exception as ex:
+                article.download_exception_msg = article.download_exception_msg or str(ex)
+                log.warning('download of %s failed: %s' % (article.url, ex))
+        return article
+
+
+def parse_article(article):
+    """Runs in a worker process. lxml trees can't be sent back to the parent
+    process, so `doc`, `clean_doc`, `top_node` and `clean_top_node` are
+    released once parsed
+    """
+    if DOWNLOADED not in article.workflow:
+        return article
+    # noinspection PyBroadException
+    try:
+        if PARSED not in article.workflow:
+            article.parse()
+            if article.config.use_canonical_link and article.canonical_link and \
+                    article.canonical_link != article.url:
+                # same as Article.build(), rebuild once from the canonical link
+                article.url = article.canonical_link
+                article.download()
+                article.parse()
+    except Exception as ex:
+        article.build_exception_msg = 'parse failed: %s' % ex
+        log.warning('parse of %s failed: %s' % (article.url, ex))
+    article.doc = article.clean_doc = None
+    article.top_node = article.clean_top_node = None
+    return article
+
+
+def nlp_article(article):
+    """Runs in a worker process of the nlp pool, which keeps its spaCy
+    pipelines loaded from one article to the next
+    """
+    if PARSED not in article.workflow:
+        return article
+    # noinspection PyBroadException
+    try:
+        article.nlp()
+    except Exception as ex:
+        article.build_exception_msg = 'nlp failed: %s' % ex
+        log.warning('nlp of %s failed: %s' % (article.url, ex))
+    return article
+
+
+def warm_nlp_worker(languages, profile):
+    """Initializer of the nlp worker processes. A pipeline which fails to
+    load, e.g. a spaCy model not installed, fails the nlp of its articles
+    rather than every worker of the pool
+    """
+    from .language_models import warm_pipelines
+    # noinspection PyBroadException
+    try:
+        warm_pipelines(languages, profile)
+    except Exception as ex:
+        log.warning('loading the spaCy pipelines of %s failed: %s' % (', '.join(languages), ex))
+
+
+def build_articles(urls, config=None, parse_processes=None, nlp_processes=1,
+                   max_pending=None, languages=None, nlp=True):
+    """Generator equivalent of calling Article(url).build() for every url,
+    yields articles as they are finished, not in the order of `urls`.
+    Articles which failed to download, parse or nlp are yielded as well,
+    check their `workflow`, `download_exception_msg` and
+    `build_exception_msg`.
+
+    parse_processes -- size of the parse process pool, defaults to the CPU count
+    nlp_processes -- size of the nlp process pool
+    max_pending -- max articles held by each stage, defaults to 2 * number_threads
+    languages -- language codes whose spaCy pipelines are loaded on nlp worker startup
+    nlp -- set to False to only download and parse
+    """
+    config = config or Configuration()
+    max_pending = max_pending or 2 * config.number_threads
+    stopped = threading.Event()
+    finished = False
+
+    # the process pools are created before any thread of this function
+    # starts, see get_process_context()
+    context = get_process_context()
+    download_executor = ThreadPoolExecutor(max_workers=config.number_threads)
+    parse_executor = ProcessPoolExecutor(max_workers=parse_processes, mp_context=context)
+    executors = [download_executor, parse_executor]
+    downloads = Stage(HostLimitedDownloader(config.max_connections_per_host),
+                      download_executor, max_pending, stopped)
+    parses = Stage(parse_article, parse_executor, max_pending, stopped)
+    stages = [downloads, parses]
+    if nlp:
+        if languages:
+            nlp_executor = ProcessPoolExecutor(max_workers=nlp_processes, mp_context=context,
+                                               initializer=warm_nlp_worker,
+                                               initargs=(languages, config.nlp_profile))
+        else:
+            nlp_executor = ProcessPoolExecutor(max_workers=nlp_processes, mp_context=context)
+        executors.append(nlp_executor)
+        stages.append(Stage(nlp_article, nlp_executor, max_pending, stopped))
+
+    def feed():
+        try:
+            for url in urls:
+                if not downloads.submit(Article(url, config=config)):
+                    break
+        finally:
+            downloads.close()
+
+    def relay(upstream, downstream):
+        try:
+            for article in upstream:
+                if not downstream.submit(article):
+                    break
+        finally:
+            downstream.close()
+
+    threads = [threading.Thread(target=feed, daemon=True)]
+    for upstream, downstream in zip(stages, stages[1:]):
+        threads.append(threading.Thread(target=relay, args=(upstream, downstream), daemon=True))
+    for thread in threads:
+        thread.start()
+
+    try:
+        for article in stages[-1]:
+            yield article
+        finished = True
+    finally:
+        stopped.set()
+        for executor in executors:
+            executor.shutdown(wait=finished)
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent set of the article urls already seen for every news domain,
+which memoize_articles() uses to tell new articles apart. Urls are rows
+of an SQLite database indexed by domain and url, so membership tests and
+additions don't depend on how many urls are stored, and several threads
+or processes may add urls at once.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from . import settings
+
+__title__ = 'stimson-web-scraper'
+__author__ = 'Lucas Ou-Yang'
+__license__ = 'MIT'
+__copyright__ = 'Copyright 2014, Lucas Ou-Yang'
+__maintainer__ = "The Stimson Center"
+__maintainer_email = "cooper@pobox.com"
+
+log = logging.getLogger(__name__)
+
+SEEN_URLS_FILE = os.path.join(settings.MEMO_DIR, 'seen_urls.sqlite3')
+# seconds a writer waits for another one to commit
+BUSY_TIMEOUT = 30
+
+# the rowid orders the urls added at the same time, e.g. by one add_new()
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen_urls (
+    domain TEXT NOT NULL,
+    url TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    UNIQUE (domain, url)
+);
+CREATE INDEX IF NOT EXISTS seen_urls_by_age ON seen_urls (domain, first_seen);
+"""
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+class SeenUrlStore(object):
+    """Thread safe, every thread has its own connection to the database
+    """
+
+    def __init__(self, path=SEEN_URLS_FILE):
+        self.path = path
+        settings.ensure_directory(os.path.dirname(os.path.abspath(path)))
+        self._local = threading.local()
+        self.connection().executescript(SCHEMA)
+
+    def connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            # connections are not carried over to forked processes, and
+            # are in autocommit mode, transactions are opened explicitly
+            connection = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            # readers don't block the writer and the other way around
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def add_new(self, domain, urls, seen_at=None):
+        """Adds `urls` of `domain` and returns the ones which were not in
+        the store yet, in the order given
+        """
+        seen_at = seen_at or time.time()
+        new_urls = []
+        connection = self.connection()
+        with Transaction(connection):
+            for url in urls:
+                cursor = connection.execute(
+                    'INSERT OR IGNORE INTO seen_urls (domain, url, first_seen) VALUES (?, ?, ?)',
+                    (domain, url, seen_at))
+                if cursor.rowcount:
+                    new_urls.append(url)
+        return new_urls
+
+    def contains(self, domain, url):
+        cursor = self.connection().execute(
+            'SELECT 1 FROM seen_urls WHERE domain = ? AND url = ?', (domain, url))
+        return cursor.fetchone() is not None
+
+    def count(self, domain):
+        cursor = self.connection().execute('SELECT COUNT(*) FROM seen_urls WHERE domain = ?', (domain,))
+        return cursor.fetchone()[0]
+
+    def evict(self, domain, ttl=None, max_urls=None):
+        """Forgets the urls of `domain` first seen more than `ttl` seconds
+        ago and the oldest ones past the `max_urls` most recent ones,
+        returns how many were forgotten
+        """
+        connection = self.connection()
+        evicted = 0
+        with Transaction(connection):
+            if ttl is not None:
+                evicted += connection.execute(
+                    'DELETE FROM seen_urls WHERE domain = ? AND first_seen < ?',
+                    (domain, time.time() - ttl)).rowcount
+            if max_urls is not None:
+                evicted += connection.execute(
+                    'DELETE FROM seen_urls WHERE rowid IN ('
+                    'SELECT rowid FROM seen_urls WHERE domain = ? '
+                    'ORDER BY first_seen DESC, rowid DESC LIMIT -1 OFFSET ?)',
+                    (domain, max_urls)).rowcount
+        return evicted
+
+    def clear(self, domain=None):
+        connection = self.connection()
+        with Transaction(connection):
+            if domain is None:
+                connection.execute('DELETE FROM seen_urls')
+            else:
+                connection.execute('DELETE FROM seen_urls WHERE domain = ?', (domain,))
+
+    def import_memo_file(self, domain, path):
+        """Moves the urls of a memo file written by older versions, one url
+        per line, into the store
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            urls = [url.strip() for url in f]
+        self.add_new(domain, [url for url in urls if url], seen_at=os.path.getmtime(path))
+        os.remove(path)
+
+
+class Transaction(object):
+    """Holds the write lock of the database from the first statement,
+    so concurrent writers wait for each other instead of failing
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute('BEGIN IMMEDIATE')
+        return self.connection
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.connection.execute('ROLLBACK' if exc_type else 'COMMIT')
+
+
+def get_seen_url_store(path=SEEN_URLS_FILE):
+    """Returns the process wide SeenUrlStore of the database at `path`
+    """
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = SeenUrlStore(path)
+    return store
@@ -21,6 +21,10 @@ log = logging.getLogger(__name__)
 
 PARENT_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
 
+# stop words of the languages spaCy has, one file per language, copied
+# from spacy.lang.<code>.stop_words of spaCy 3.8
+STOPWORDS_DIR = os.path.join(PARENT_DIRECTORY, 'resources', 'text')
+
 DATA_DIRECTORY = '.scraper'
 
 TOP_DIRECTORY = os.path.join(tempfile.gettempdir(), DATA_DIRECTORY)
@@ -38,8 +42,33 @@ MEMO_DIR = os.path.join(TOP_DIRECTORY, MEMO_FILE)
 CF_CACHE_DIRECTORY = 'feed_category_cache'
 ANCHOR_DIRECTORY = os.path.join(TOP_DIRECTORY, CF_CACHE_DIRECTORY)
 
-for path in (TOP_DIRECTORY, MEMO_DIR, ANCHOR_DIRECTORY):
-    try:
-        os.mkdir(path)
-    except FileExistsError:
-        pass
+# downloaded responses, see http_cache.py
+HTTP_CACHE_DIRECTORY = os.path.join(TOP_DIRECTORY, 'http_cache')
+
+# Max number of loaded spaCy pipelines (one per language) kept per process
+MAX_NLP_PIPELINES = 4
+
+# Max number of distinct date strings whose parsed date is kept per process
+DATE_CACHE_SIZE = 4096
+
+
+def ensure_directory(path):
+    """Creates the directory `path` and its parents if needed, directories
+    are created when first used rather than when this module is imported
+    """
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def ensure_private_directory(path):
+    """Like ensure_directory() for directories only this user may read and
+    write, e.g. under the shared temporary directory. Raises PermissionError
+    if the directory belongs to another user
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    stat = os.stat(path)
+    if hasattr(os, 'getuid') and stat.st_uid != os.getuid():
+        raise PermissionError('%s belongs to another user' % path)
+    if stat.st_mode & 0o077:
+        os.chmod(path, 0o700)
+    return path
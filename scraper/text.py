@@ -4,9 +4,11 @@ Stopword extraction and stopword classes.
 """
 
 import importlib
+import os
 import string
+import threading
 
-import pyarabic.araby as araby
+from . import settings
 
 __title__ = 'stimson-web-scraper'
 __author__ = 'Lucas Ou-Yang'
@@ -16,11 +18,33 @@ __maintainer__ = "The Stimson Center"
 __maintainer_email = "cooper@pobox.com"
 
 
+# language code -> frozenset of lowercased stop words
+_cached_stop_words = {}
+
+
 def get_stopwords(language):
+    """The spaCy STOP WORDS of `language`, loaded once per process and
+    shared as an immutable, lowercased frozenset
+    """
     language_code = language[0:2]
+    stop_words = _cached_stop_words.get(language_code)
+    if stop_words is None:
+        stop_words = frozenset(word.lower() for word in load_stop_words(language_code))
+        _cached_stop_words[language_code] = stop_words
+    return stop_words
+
+
+def load_stop_words(language_code):
+    """The stop words of `language_code` shipped in STOPWORDS_DIR, which
+    spare fulltext() from importing spaCy, else the STOP_WORDS of
+    spacy.lang.<language_code>.stop_words
+    """
+    path = os.path.join(settings.STOPWORDS_DIR, 'stopwords-%s.txt' % language_code)
+    if os.path.isfile(path):
+        with open(path, encoding='utf-8') as f:
+            return f.read().splitlines()
     # use spacy language specific STOP WORDS
-    spacy_stopwords = importlib.import_module(f'spacy.lang.{language_code}.stop_words')
-    return spacy_stopwords.STOP_WORDS
+    return importlib.import_module(f'spacy.lang.{language_code}.stop_words').STOP_WORDS
 
 
 class WordStats(object):
@@ -55,23 +79,32 @@ class WordStats(object):
 
 
 class StopWords(object):
-    TRANS_TABLE = str.maketrans('', '')
-    _cached_stop_words = {}
+    """Stateless once built, use `for_language()` to share one instance
+    per class and language across articles and threads
+    """
+    TRANS_TABLE = str.maketrans('', '', string.punctuation)
+    _instances = {}
+    _instances_lock = threading.Lock()
 
     def __init__(self, language='en'):
         # use spacy language specific STOP WORDS
         self.STOP_WORDS = get_stopwords(language)
 
+    @classmethod
+    def for_language(cls, language='en'):
+        key = (cls, language[0:2])
+        stopwords = cls._instances.get(key)
+        if stopwords is None:
+            with cls._instances_lock:
+                stopwords = cls._instances.get(key)
+                if stopwords is None:
+                    stopwords = cls._instances[key] = cls(language=language)
+        return stopwords
+
     def remove_punctuation(self, content):
         # code taken form
         # http://stackoverflow.com/questions/265960/best-way-to-strip-punctuation-from-a-string-in-python
-        content_is_unicode = isinstance(content, str)
-        if content_is_unicode:
-            content = content.encode('utf-8')
-        trans_table = {ord(c): None for c in string.punctuation}
-        stripped_input = content.decode('utf-8').translate(trans_table)
-
-        return stripped_input
+        return content.translate(self.TRANS_TABLE)
 
     def candidate_words(self, stripped_input):
         words = stripped_input.split(' ')
@@ -128,6 +161,7 @@ class StopWordsArabic(StopWords):
 
     def candidate_words(self, stripped_input):
         # https://github.com/linuxscout/pyarabic/blob/master/tests/test_araby.py
+        import pyarabic.araby as araby
         words = araby.tokenize(stripped_input)
         return words
 
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+Wall time, CPU time and bytes spent by every stage of an article, e.g.
+`download`, `parse` and its steps `parse.cleaner` or `parse.formatter`,
+kept in `Article.timings`. Functions added with add_timing_hook() are
+called after every stage, e.g. to send the timings to a monitoring
+system.
+"""
+
+import cProfile
+import io
+import logging
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+from contextlib import contextmanager
+
+__title__ = 'stimson-web-scraper'
+__author__ = 'Lucas Ou-Yang'
+__license__ = 'MIT'
+__copyright__ = 'Copyright 2014, Lucas Ou-Yang'
+__maintainer__ = "The Stimson Center"
+__maintainer_email = "cooper@pobox.com"
+
+log = logging.getLogger(__name__)
+
+# lines of the cProfile report kept per stage
+PROFILE_LINES = 40
+
+_hooks = []
+_hooks_lock = threading.Lock()
+# cProfile and tracemalloc only follow one stage at a time per process
+_capture_lock = threading.Lock()
+
+
+def add_timing_hook(hook):
+    """`hook(article, stage, timing)` is called after every stage of every
+    article of this process, with the StageTiming of the stage so far
+    """
+    with _hooks_lock:
+        _hooks.append(hook)
+
+
+def remove_timing_hook(hook):
+    with _hooks_lock:
+        _hooks.remove(hook)
+
+
+class StageTiming(object):
+    """Totals of the runs of a stage. `bytes` is the size of what the stage
+    produced when it is meaningful, e.g. the downloaded html. `memory_peak`
+    and `profile` are only set if the Timings capture them
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.bytes = 0
+        self.memory_peak = None
+        self.profile = None
+
+    def as_dict(self):
+        return {'calls': self.calls, 'wall': self.wall, 'cpu': self.cpu, 'bytes': self.bytes,
+                'memory_peak': self.memory_peak}
+
+    def __repr__(self):
+        return 'StageTiming(calls=%d, wall=%.6f, cpu=%.6f, bytes=%d)' % (
+            self.calls, self.wall, self.cpu, self.bytes)
+
+
+class Timings(object):
+    """Ordered stage name -> StageTiming. With `profile` the outermost
+    stages run under cProfile and keep the report of their slowest
+    functions, with `trace_memory` they keep the peak of memory allocated
+    while they ran, see tracemalloc
+    """
+
+    def __init__(self, profile=False, trace_memory=False):
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.stages = OrderedDict()
+        self._depth = 0
+
+    @contextmanager
+    def measure(self, stage, article=None):
+        """Adds the time spent in the `with` block to `stage`, yields its
+        StageTiming so the block can add to its `bytes`
+        """
+        timing = self.stages.get(stage)
+        if timing is None:
+            timing = self.stages[stage] = StageTiming()
+        capture = (self.profile or self.trace_memory) and self._depth == 0 and \
+            _capture_lock.acquire(blocking=False)
+        profiler, started_tracing, measure_memory = self._start_capture() if capture else (None, False, False)
+        self._depth += 1
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield timing
+        finally:
+            timing.wall += time.perf_counter() - wall
+            timing.cpu += time.process_time() - cpu
+            timing.calls += 1
+            self._depth -= 1
+            if capture:
+                self._stop_capture(timing, profiler, started_tracing, measure_memory)
+                _capture_lock.release()
+            with _hooks_lock:
+                hooks = list(_hooks)
+            for hook in hooks:
+                # noinspection PyBroadException
+                try:
+                    hook(article, stage, timing)
+                except Exception as ex:
+                    log.warning('timing hook %r failed on %s: %s' % (hook, stage, ex))
+
+    def _start_capture(self):
+        """Returns the running profiler, whether tracemalloc was started and
+        whether the peak of memory of the stage is measured
+        """
+        started_tracing = measure_memory = False
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = measure_memory = True
+            elif hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+                measure_memory = True
+            # else Python < 3.9 can't reset the peak of tracing started by
+            # someone else, which is left alone and the peak not measured
+        profiler = None
+        if self.profile:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        return profiler, started_tracing, measure_memory
+
+    def _stop_capture(self, timing, profiler, started_tracing, measure_memory):
+        if profiler is not None:
+            profiler.disable()
+            report = io.StringIO()
+            pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(PROFILE_LINES)
+            timing.profile = report.getvalue()
+        if measure_memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            timing.memory_peak = max(peak, timing.memory_peak or 0)
+        if started_tracing:
+            tracemalloc.stop()
+
+    def __getitem__(self, stage):
+        return self.stages[stage]
+
+    def __contains__(self, stage):
+        return stage in self.stages
+
+    def __iter__(self):
+        return iter(self.stages)
+
+    def items(self):
+        return self.stages.items()
+
+    def as_dict(self):
+        return OrderedDict((stage, timing.as_dict()) for stage, timing in self.stages.items())
+
+    def __repr__(self):
+        return 'Timings(%s)' % ', '.join('%s=%.6f' % (stage, timing.wall) for stage, timing in self.stages.items())
@@ -4,11 +4,14 @@ Holds misc. utility methods which prove to be
 useful throughout this library.
 """
 
-import codecs
+import datetime
+import functools
 import hashlib
 import logging
+import multiprocessing
 import os
 import re
+import threading
 import time
 
 from bs4 import BeautifulSoup
@@ -131,54 +134,38 @@ def extract_meta_refresh(html):
                 return url_part[4:].replace('"', '').replace("'", '')
 
 
-def memoize_articles(source, articles):
+def memoize_articles(source, articles, store=None):
     """When we parse the <a> links in an <html> page, on the 2nd run
     and later, check the <a> links of previous runs. If they match,
     it means the link must not be an article, because article urls
     change as time passes. This method also uniquifies articles.
+
+    `source` is the domain of the articles or an object with `domain`
+    and `config` attributes. Urls are forgotten `config.memo_ttl` seconds
+    after they were first seen, and the oldest ones once there are more
+    than `config.MAX_FILE_MEMO` for the domain. `store` defaults to the
+    SeenUrlStore in settings.MEMO_DIR
     """
-    source_domain = source.domain
-    config = source.config
+    from .configuration import Configuration
+    from .seen_urls import get_seen_url_store
+
+    source_domain = getattr(source, 'domain', source)
+    config = getattr(source, 'config', None) or Configuration()
 
     if len(articles) == 0:
         return []
 
-    memo = {}
-    cur_articles = {article.url: article for article in articles}
+    cur_articles = {article.url.strip(): article for article in articles}
+    store = store or get_seen_url_store()
+    # urls memoized by older versions, one flat file per domain
     d_pth = os.path.join(settings.MEMO_DIR, domain_to_filename(source_domain))
-
     if os.path.exists(d_pth):
-        f = codecs.open(d_pth, 'r', 'utf8')
-        urls = f.readlines()
-        f.close()
-        urls = [u.strip() for u in urls]
-
-        memo = {url: True for url in urls}
-        # prev_length = len(memo)
-        for url, article in list(cur_articles.items()):
-            if memo.get(url):
-                del cur_articles[url]
-
-        valid_urls = list(memo.keys()) + list(cur_articles.keys())
-
-        memo_text = '\r\n'.join(
-            [href.strip() for href in valid_urls])
-    # Our first run with memoization, save every url as valid
-    else:
-        memo_text = '\r\n'.join(
-            [href.strip() for href in list(cur_articles.keys())])
+        store.import_memo_file(source_domain, d_pth)
 
-    # new_length = len(cur_articles)
-    if len(memo) > config.MAX_FILE_MEMO:
-        # We still keep current batch of articles though!
-        log.critical('memo overflow, dumping')
-        memo_text = ''
-
-    # TODO if source: source.write_upload_times(prev_length, new_length)
-    ff = codecs.open(d_pth, 'w', 'utf-8')
-    ff.write(memo_text)
-    ff.close()
-    return list(cur_articles.values())
+    store.evict(source_domain, ttl=config.memo_ttl)
+    new_urls = store.add_new(source_domain, list(cur_articles))
+    store.evict(source_domain, max_urls=config.MAX_FILE_MEMO)
+    return [cur_articles[url] for url in new_urls]
 
 
 def get_language_codes():
@@ -294,7 +281,58 @@ def fulltext(html, language='en'):
     return text
 
 
+def get_process_context():
+    """multiprocessing context of the process pools: their workers are
+    started from threads, and forking a process with running threads may
+    deadlock the child, so they are started by a fork server, or spawned
+    where there is none, e.g. on Windows
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+
+# day of the dates cached by the daily_date_cache() functions, missing
+# fields of a parsed date are filled in from today
+_date_cache_day = None
+_date_cache_lock = threading.Lock()
+_daily_date_caches = []
+
+
+def daily_date_cache(function):
+    """lru_cache of a date parser, cleared by clear_stale_date_caches()
+    when the day changes
+    """
+    cached = functools.lru_cache(maxsize=settings.DATE_CACHE_SIZE)(function)
+    _daily_date_caches.append(cached)
+    return cached
+
+
+def clear_stale_date_caches():
+    """Clears the caches of the daily_date_cache() functions on the first
+    call of a new day, returns today
+    """
+    global _date_cache_day
+    today = datetime.date.today()
+    with _date_cache_lock:
+        if _date_cache_day != today:
+            for cached in _daily_date_caches:
+                cached.cache_clear()
+            _date_cache_day = today
+    return today
+
+
 def parse_date_str(date_str):
+    """The datetime of `date_str`, None if it is not a date. The same date
+    strings come back from article to article, their datetimes are cached
+    for the day
+    """
+    clear_stale_date_caches()
+    return _parse_date_str(date_str)
+
+
+@daily_date_cache
+def _parse_date_str(date_str):
     if date_str:
         try:
             return date_parser(date_str)
@@ -50,5 +50,5 @@ setuptools.setup(
         [console_scripts]
         scraper=scraper.cli:parse
     ''',
-    python_requires=">=3.6",
+    python_requires=">=3.7",
 )
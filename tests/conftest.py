@@ -1,5 +1,8 @@
+import functools
 import os
+import threading
 import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
 
 import pytest
 
@@ -10,6 +13,28 @@ def fixture_directory():
     return os.path.join(os.path.dirname(__file__), "fixtures")
 
 
+class QuietHTTPRequestHandler(SimpleHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def http_server():
+    """
+    Local HTTP stand-in serving the fixtures directory, yields its base url
+    """
+    directory = os.path.join(os.path.dirname(__file__), "fixtures")
+    handler = functools.partial(QuietHTTPRequestHandler, directory=directory)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:%s' % server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
 def mock_resource_with(filename, resource_type):
     """
     Mocks an HTTP request by pulling text from a pre-downloaded file
@@ -32,6 +57,7 @@ def print_test(method):
     time taken for test and functions name, and status
     """
 
+    @functools.wraps(method)
     def run(*args, **kw):
         ts = time.time()
         print('\ttesting function %r' % method.__name__)
@@ -7,8 +7,8 @@ import os
 import unittest
 from collections import defaultdict, OrderedDict
 
-from scraper import Article, fulltext, ArticleException
-from scraper.article import DOWNLOADED
+from scraper import Article, fulltext, ArticleException, nlp_batch
+from scraper.article import DOWNLOADED, NLPED
 from scraper.configuration import Configuration
 from tests.conftest import print_test, mock_resource_with
 
@@ -118,6 +118,7 @@ class ArticleTestCase(unittest.TestCase):
 
     @print_test
     def test_meta_type_extraction(self):
+        self.article.config.keep_clean_doc = True
         self.setup_stage('meta')
         meta_type = self.article.extractor.get_meta_type(
             self.article.clean_doc)
@@ -125,6 +126,7 @@ class ArticleTestCase(unittest.TestCase):
 
     @print_test
     def test_meta_extraction(self):
+        self.article.config.keep_clean_doc = True
         self.setup_stage('meta')
         meta = self.article.extractor.get_meta_data(self.article.clean_doc)
         META_DATA = defaultdict(dict, {
@@ -172,6 +174,14 @@ class ArticleTestCase(unittest.TestCase):
         is_string = lambda v: isinstance(v, str)
         self.assertEqual(12, len([i for i in meta.values() if is_string(i)]))
 
+    @print_test
+    def test_clean_doc_is_opt_in(self):
+        self.setup_stage('meta')
+        self.assertIsNone(self.article.clean_doc)
+        self.assertIsNone(self.article.clean_top_node)
+        self.assertEqual('article', self.article.extractor.get_meta_type(
+            self.article.config.get_parser().from_string(self.article.html)))
+
     @print_test
     def test_pre_download_nlp(self):
         """Test running NLPED algos before even downloading the article
@@ -209,6 +219,34 @@ class ArticleTestCase(unittest.TestCase):
         SUMMARY = mock_resource_with('cnn_summary', 'txt')
         self.assertEqual(SUMMARY, self.article.summary)
 
+    @print_test
+    def test_nlp_batch(self):
+        self.setup_stage('nlp')
+        self.article.nlp()
+        batch = [Article(self.article.url) for _ in range(3)]
+        for article in batch:
+            article.download(mock_resource_with('cnn_article', 'html'))
+            article.parse()
+        nlp_batch(batch, batch_size=2)
+        for article in batch:
+            self.assertTrue(NLPED in article.workflow)
+            self.assertEqual(self.article.keywords, article.keywords)
+            self.assertEqual(self.article.summary, article.summary)
+
+    @print_test
+    def test_nlp_profile(self):
+        self.setup_stage('nlp')
+        self.article.nlp()
+        config = Configuration()
+        config.nlp_profile = 'keywords'
+        article = Article(self.article.url, config=config)
+        article.download(mock_resource_with('cnn_article', 'html'))
+        article.parse()
+        article.nlp()
+        self.assertTrue(NLPED in article.workflow)
+        self.assertEqual(self.article.keywords, article.keywords)
+        self.assertEqual('', article.summary)
+
     @print_test
     def test_download_file_success(self):
         url = "file://" + os.path.join(HTML_FN, "cnn_article.html")
@@ -230,6 +268,21 @@ class ArticleTestCase(unittest.TestCase):
             self.assertTrue(DOWNLOADED not in article.workflow)
             self.assertEqual(article.download_exception_msg, "No such file or directory")
 
+    @print_test
+    def test_wikipedia_tables_from_downloaded_html(self):
+        article = Article(url="https://en.wikipedia.org/wiki/Pronunciation_chart", fetch_images=False)
+        article.download(input_html=mock_resource_with('wikipedia_tables', 'html'))
+        article.parse()
+        self.assertEqual(2, len(article.tables))
+        self.assertEqual('Vowels', article.tables[0]['name'])
+        self.assertEqual([['Word', 'Dialect', 'Dialect'],
+                          ['Word', 'RP', 'GA'],
+                          ['bath', 'ɑː', 'æ'],
+                          ['lot', 'ɒ', 'ɒ'],
+                          ['lot', 'ɒ', 'ɑ']], article.tables[0]['rows'])
+        self.assertEqual('1', article.tables[1]['name'])
+        self.assertEqual([['a', 'b', ''], ['c', 'c', 'c']], article.tables[1]['rows'])
+
     @print_test
     def test_wikipedia_tables(self):
         url = "https://en.wikipedia.org/wiki/International_Phonetic_Alphabet_chart_for_English_dialects"
@@ -2,9 +2,10 @@
 """
 All unit tests for the content extractors should be contained in this file.
 """
+from collections import Counter
 
 from scraper import Configuration
-from scraper.content_extractor import ContentExtractor
+from scraper.content_extractor import ContentExtractor, DocumentIndex
 from scraper.parser import Parser
 
 """Test specific element extraction cases"""
@@ -111,3 +112,73 @@ def test_get_top_image_from_meta():
     doc = parser.from_string(html_rel_icon)
     assert extractor.get_meta_img_url('http://www.example.com/article?foo=bar',
                                       doc) == 'https://example.com/meta_link_rel_icon.ico'
+
+
+def test_document_index_matches_parser():
+    extractor, parser = setUp()
+    html = '<html><head><meta name="Author" content="Jane Doe"/>' \
+           '<meta property="article:author" content="John Smith"/>' \
+           '<link rel="Shortcut Icon" href="/favicon.ico"/></head>' \
+           '<body><div class="byline-AUTHOR">By Jane Doe</div><span id="x">y</span></body></html>'
+    doc = parser.from_string(html)
+    index = DocumentIndex(doc)
+    for attr, value, tag in [('name', 'author', None), ('property', 'author', 'meta'),
+                             ('class', 'author', None), ('rel', 'icon', 'link'),
+                             ('id', 'byline', None)]:
+        assert index.find(attr, value, tag=tag) == \
+               parser.get_elements_by_tag(doc, tag=tag, attr=attr, value=value)
+    assert index.meta('name', 'Author')[0].get('content') == 'Jane Doe'
+    assert index.meta('name', 'author') == []
+    assert extractor.get_authors(doc) == ['John Smith', 'Jane Doe']
+    assert extractor.get_favicon(doc) == '/favicon.ico'
+
+
+def test_document_index_is_rebuilt_for_another_doc():
+    extractor, parser = setUp()
+    doc = parser.from_string('<meta property="og:type" content="article"/>')
+    assert extractor.get_index(doc) is extractor.get_index(doc)
+    assert extractor.get_meta_type(doc) == 'article'
+    other = parser.from_string('<meta property="og:type" content="video"/>')
+    assert extractor.get_meta_type(other) == 'video'
+    extractor.release_index()
+    assert extractor.get_meta_type(doc) == 'article'
+
+
+def test_each_paragraph_is_tokenized_once(monkeypatch):
+    extractor, parser = setUp()
+    paragraph = '<p>This is one of the paragraphs of the article, it has %d of the words that are in it.</p>'
+    html = '<html><body><div><p>Photo caption</p>%s</div><div>%s</div></body></html>' % (
+        ''.join(paragraph % i for i in range(20)), paragraph % 99)
+    doc = parser.from_string(html)
+
+    tokenized = Counter()
+    stopwords = extractor.get_stopwords()
+    get_stopword_count = stopwords.get_stopword_count
+
+    def counting_get_stopword_count(content):
+        tokenized[content] += 1
+        return get_stopword_count(content)
+
+    # the stopwords instance is shared, monkeypatch restores it
+    monkeypatch.setattr(stopwords, 'get_stopword_count', counting_get_stopword_count)
+    top_node = extractor.calculate_best_node(doc, html)
+    extractor.post_cleanup(top_node)
+    assert top_node.tag == 'div'
+    assert tokenized and max(tokenized.values()) == 1
+
+
+def test_gravity_scores_are_kept_off_the_dom():
+    extractor, parser = setUp()
+    paragraph = '<p>This is one of the paragraphs of the article, it has some of the words that are in it.</p>'
+    html = '<html><body><div id="a">%s</div><div id="b">%s</div></body></html>' % (
+        paragraph * 3, paragraph * 5)
+    doc = parser.from_string(html)
+    top_node = extractor.calculate_best_node(doc, html)
+    assert top_node.get('id') == 'b'
+    assert extractor.get_score(top_node) > extractor.get_score(doc.get_element_by_id('a')) > 0
+    assert extractor.gravity_nodes[top_node] == 5
+    assert not doc.xpath('//*[@gravityScore or @gravityNodes]')
+
+    extractor.set_gravity_attributes()
+    assert float(top_node.get('gravityScore')) == extractor.get_score(top_node)
+    assert top_node.get('gravityNodes') == '5'
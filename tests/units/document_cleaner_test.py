@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+All unit tests for the document cleaner should be contained in this file.
+"""
+
+import glob
+import os
+
+import pytest
+
+from scraper import Configuration
+from scraper.document_cleaner import DocumentCleaner
+from scraper.parser import Parser
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'fixtures', 'html')
+
+
+def clean_step_by_step(cleaner, doc):
+    """clean() as it was written before the steps were merged into one walk
+    """
+    doc = cleaner.clean_body_classes(doc)
+    doc = cleaner.clean_article_tags(doc)
+    doc = cleaner.clean_em_tags(doc)
+    doc = cleaner.remove_drop_caps(doc)
+    doc = cleaner.remove_scripts_styles(doc)
+    doc = cleaner.clean_bad_tags(doc)
+    for pattern in cleaner.get_remove_patterns():
+        doc = cleaner.remove_nodes_regex(doc, pattern)
+    doc = cleaner.clean_para_spans(doc)
+    for dom_type in ['div', 'span', 'section']:
+        doc = cleaner.div_to_para(doc, dom_type)
+    return doc
+
+
+def assert_same_as_step_by_step(html, config=None):
+    cleaner = DocumentCleaner(config or Configuration())
+    expected = Parser.node_to_string(clean_step_by_step(cleaner, Parser.from_string(html)))
+    assert Parser.node_to_string(cleaner.clean(Parser.from_string(html))) == expected
+    return expected
+
+
+@pytest.mark.parametrize('html', [
+    # siblings removed by different steps, their tails end up in the same place
+    '<html><body><div><p>text</p><span class="share twitter">a</span>one'
+    '<span id="footer">b</span>two<span class="Caption">c</span>three</div></body></html>',
+    # the itemprop="articleBody" child is removed by its id before its parent is
+    # tested by class, so the parent no longer contains an article
+    '<html><body><div class="footer"><p>keep?</p><div id="comments" itemprop="articleBody">'
+    '<p>body</p></div></div><p>rest</p></body></html>',
+    # an <article> keeps its parents but loses its own id and class
+    '<html><body><div id="footer"><article id="comment" class="tools"><p>article</p></article></div></body></html>',
+    # dropped ems and drop caps are not tested against the regexes
+    '<html><body class="footer"><p><em class="footer">emphasis</em> and '
+    '<em class="footer"><img src="a.jpg"/></em> <span class="x dropcap">T</span>he end</p></body></html>',
+    '<html><body><!-- comment --><script>var a;</script><p>a<style>p {}</style>b</p></body></html>',
+])
+def test_clean_is_same_as_step_by_step(html):
+    assert_same_as_step_by_step(html)
+
+
+def test_clean_with_additional_remove_nodes_re():
+    config = Configuration()
+    config.additional_remove_nodes_re = 'newsletter'
+    cleaned = assert_same_as_step_by_step(
+        '<html><body><div class="Newsletter-box">a</div><p>b</p></body></html>', config)
+    assert 'Newsletter' not in cleaned
+
+
+def test_clean_is_same_as_step_by_step_on_fixtures():
+    for filename in sorted(glob.glob(os.path.join(FIXTURES, '*.html'))):
+        with open(filename, encoding='utf-8') as f:
+            html = f.read()
+        if Parser.from_string(html) is not None:
+            assert_same_as_step_by_step(html)
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+All unit tests for the on-disk http response cache should be contained in this file.
+"""
+import json
+import os
+import pickle
+import time
+
+import pytest
+import requests
+
+from scraper import Configuration
+from scraper.http_cache import CacheEntry, HttpCache, get_http_cache, get_max_age, normalize_url
+from scraper.network import TEXT_CONTENT, get_html_2XX_only
+from tests.conftest import mock_resource_with
+
+
+@pytest.fixture
+def config(tmp_path):
+    config = Configuration()
+    config.use_http_cache = True
+    config.http_cache_directory = str(tmp_path)
+    return config
+
+
+@pytest.fixture
+def status_codes(monkeypatch):
+    """Status codes of the responses the server sent
+    """
+    codes = []
+    get = requests.Session.get
+
+    def recording_get(session, *args, **kwargs):
+        response = get(session, *args, **kwargs)
+        codes.append(response.status_code)
+        return response
+
+    monkeypatch.setattr(requests.Session, 'get', recording_get)
+    return codes
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('HTTP://Example.COM:80/a/b?x=1#top', 'http://example.com/a/b?x=1'),
+    ('https://example.com', 'https://example.com/'),
+    ('https://example.com:8443/a', 'https://example.com:8443/a'),
+])
+def test_normalize_url(url, expected):
+    assert normalize_url(url) == expected
+
+
+def test_get_max_age():
+    assert get_max_age({'cache-control': 'public, max-age=600'}) == 600
+    assert get_max_age({'cache-control': 'no-cache'}) == 0
+    assert get_max_age({}) is None
+
+
+def test_cached_response_is_used_until_stale(http_server, config, status_codes):
+    url = '%s/html/cnn_article.html' % http_server
+    html = mock_resource_with('cnn_article', 'html')
+    assert get_html_2XX_only(url, config)[0] == html
+    assert get_html_2XX_only(url + '#comments', config)[0] == html
+    assert status_codes == [200]
+
+    # the fixture server answers If-Modified-Since with 304
+    config.http_cache_ttl = 0
+    assert get_html_2XX_only(url, config)[0] == html
+    assert status_codes == [200, 304]
+
+
+def test_lru_eviction(tmp_path):
+    cache = HttpCache(str(tmp_path), max_size=3600)
+    for i in range(3):
+        cache.put('http://example.com/%d' % i, CacheEntry('http://example.com/%d' % i, {}, b'x' * 1000,
+                                                          TEXT_CONTENT))
+        os.utime(cache.path('http://example.com/%d' % i), (time.time() - 100 + i, time.time() - 100 + i))
+    # reading an entry makes it the most recently used
+    assert cache.get('http://example.com/0').content == b'x' * 1000
+    cache.put('http://example.com/3', CacheEntry('http://example.com/3', {}, b'x' * 1000, TEXT_CONTENT))
+    assert cache.get('http://example.com/1') is None
+    assert cache.get('http://example.com/0') is not None
+    assert cache.get('http://example.com/3') is not None
+    assert cache.size() <= 3600
+
+
+def test_entries_are_json_and_raw_body(tmp_path):
+    cache = HttpCache(str(tmp_path / 'cache'))
+    url = 'http://example.com/a'
+    cache.put(url, CacheEntry(url, {'ETag': '"1"'}, b'\x00body\nbytes', TEXT_CONTENT, fetched=1000))
+    with open(cache.path(url), 'rb') as f:
+        metadata, body = f.read().split(b'\n', 1)
+    assert json.loads(metadata.decode('utf-8'))['headers'] == {'ETag': '"1"'}
+    assert body == b'\x00body\nbytes'
+    entry = cache.get(url)
+    assert (entry.url, entry.content, entry.fetched) == (url, b'\x00body\nbytes', 1000)
+
+
+def test_planted_pickle_is_not_loaded(tmp_path):
+    cache = HttpCache(str(tmp_path / 'cache'))
+    url = 'http://example.com/a'
+    with open(cache.path(url), 'wb') as f:
+        f.write(pickle.dumps(CacheEntry(url, {}, b'body', TEXT_CONTENT)))
+    assert cache.get(url) is None
+    assert not os.path.exists(cache.path(url))
+
+
+def test_private_directory(tmp_path, monkeypatch):
+    directory = str(tmp_path / 'cache')
+    os.makedirs(directory, mode=0o777)
+    os.chmod(directory, 0o777)
+    HttpCache(directory)
+    assert os.stat(directory).st_mode & 0o777 == 0o700
+
+    # owned by someone else
+    monkeypatch.setattr(os, 'getuid', lambda: os.stat(directory).st_uid + 1)
+    with pytest.raises(PermissionError):
+        HttpCache(directory)
+    config = Configuration()
+    config.http_cache_directory = directory
+    assert get_http_cache(config) is None
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""
+All unit tests for the import time of the scraper package should be
+contained in this file.
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+# only imported by the code paths needing them, e.g. Article.nlp()
+HEAVY_MODULES = ['spacy', 'pytextrank', 'dateparser', 'date_extractor', 'numpy', 'PIL',
+                 'PyPDF4', 'pdftotext', 'pyarabic']
+MAX_IMPORT_SECONDS = 1.5
+
+
+def run_python(code):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    return result.stdout, result.stderr
+
+
+def cumulative_import_seconds(importtime, module):
+    """Cumulative time of `module` in the output of `python -X importtime`
+    """
+    for line in importtime.splitlines():
+        parts = line.split('|')
+        if len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1]) / 1e6
+    return None
+
+
+def test_heavy_modules_are_not_imported():
+    code = 'import sys, scraper; from scraper import fulltext; fulltext(open(%r).read()); ' \
+           'print(" ".join(m for m in %r if m in sys.modules))' % (
+               os.path.join('tests', 'fixtures', 'html', 'cnn_article.html'), HEAVY_MODULES)
+    stdout, stderr = run_python(code)
+    assert stdout.split() == []
+
+
+def test_import_time():
+    stdout, stderr = run_python('import scraper')
+    assert cumulative_import_seconds(stderr, 'scraper') < MAX_IMPORT_SECONDS
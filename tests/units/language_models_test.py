@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+All unit tests for the spaCy pipeline registry should be contained in this file.
+"""
+
+import pytest
+import spacy
+
+from scraper import language_models
+from scraper.language_models import (OPTIONAL_COMPONENTS, PipelineRegistry, build_pipeline, get_pipeline,
+                                     get_profile_components, get_profile_results, normalize_profile)
+from tests.conftest import print_test
+
+
+@print_test
+def test_pipeline_is_loaded_once():
+    nlp = get_pipeline("en")
+    assert nlp is get_pipeline("en")
+    assert nlp is get_pipeline("en-US")
+    assert "textrank" in nlp.pipe_names
+
+
+@print_test
+def test_least_recently_used_pipeline_is_evicted():
+    registry = PipelineRegistry(max_size=1)
+    registry.warm(["en"])
+    assert "en" in registry
+    # no dedicated model, falls back to the multi-language model + sentencizer
+    nlp = registry.get("sw")
+    assert "sentencizer" in nlp.pipe_names
+    assert "en" not in registry
+    assert registry.languages() == ["sw"]
+
+
+@print_test
+def test_profile_results():
+    assert get_profile_results('keywords') == {'keywords'}
+    assert get_profile_results('keywords, dates') == {'keywords', 'dates'}
+    assert get_profile_results('full') == {'keywords', 'summary', 'title', 'dates'}
+    with pytest.raises(ValueError):
+        get_profile_results('everything')
+
+
+@print_test
+def test_profile_components():
+    assert get_profile_components('keywords') == {'tagger', 'sentences'}
+    assert get_profile_components('dates') == {'ner'}
+    assert 'textrank' in get_profile_components('full')
+
+
+@print_test
+def test_profile_pipelines():
+    nlp = get_pipeline("en", "keywords")
+    assert nlp is not get_pipeline("en")
+    assert nlp is get_pipeline("en-US", "keywords")
+    assert "tagger" in nlp.pipe_names
+    assert "parser" not in nlp.pipe_names and "ner" not in nlp.pipe_names
+    assert "textrank" not in nlp.pipe_names
+
+
+
+@print_test
+def test_normalize_profile():
+    assert normalize_profile('dates, keywords') == normalize_profile('keywords,dates') == 'dates,keywords'
+    assert normalize_profile('keywords, summary, dates, full') == 'full'
+
+
+@print_test
+def test_equivalent_profiles_share_a_pipeline(monkeypatch):
+    built = []
+    monkeypatch.setattr(language_models, 'build_pipeline', lambda *key: built.append(key) or object())
+    registry = PipelineRegistry()
+    nlp = registry.get('en', 'keywords,dates')
+    assert registry.get('en', 'dates, keywords') is nlp
+    assert registry.get('en', 'full') is registry.get('en', 'dates,full')
+    assert built == [('en', 'dates,keywords'), ('en', 'full')]
+
+
+def load_blank(name, disable=(), exclude=()):
+    """Stands in for spacy.load(), a blank pipeline with untrained
+    components instead of a downloaded model
+    """
+    nlp = spacy.blank('xx' if name == language_models.MULTI_LANGUAGE_MODEL else 'en')
+    names = ['ner'] if name == language_models.MULTI_LANGUAGE_MODEL else OPTIONAL_COMPONENTS
+    for component in names:
+        if component not in disable and component not in exclude:
+            nlp.add_pipe(component if not language_models.SPACY_V2 else nlp.create_pipe(component))
+    return nlp
+
+
+@pytest.mark.parametrize('language_code, profile, pipe_names', [
+    ('en', 'keywords', ['tagger', 'sentencizer']),
+    ('en', 'summary', ['sentencizer']),
+    ('en', 'dates', ['ner', 'sentencizer']),
+    ('en', 'keywords,dates', ['tagger', 'ner', 'sentencizer']),
+    ('en', 'full', ['tagger', 'parser', 'ner', 'textrank']),
+    ('sw', 'full', ['ner', 'sentencizer', 'textrank']),
+])
+def test_build_profile_pipeline(monkeypatch, language_code, profile, pipe_names):
+    monkeypatch.setattr(language_models.spacy, 'load', load_blank)
+    assert build_pipeline(language_code, profile).pipe_names == pipe_names
@@ -3,11 +3,20 @@
 All unit tests for the scraper Article should be contained in this file.
 """
 
+import datetime
+import threading
+from types import SimpleNamespace
+
+import dateparser
+import numpy as np
+import pytest
 import spacy
 
-from scraper import Article, Configuration
-from scraper.named_entity_recognition import TextRank4Keyword
+from scraper import Article, Configuration, named_entity_recognition, utils
+from scraper.named_entity_recognition import (DEFAULT_STOP_WORDS, TextRank4Keyword, mark_stopwords, parse_date,
+                                              rank_words)
 from scraper.text import get_stopwords
+from tests.conftest import print_test
 
 
 def validate(url, language):
@@ -25,6 +34,144 @@ def validate(url, language):
     return article
 
 
+SENTENCES = [
+    ['Alan', 'Cooper', 'Temple', 'University', 'Cooper'],
+    ['email'],
+    [],
+    ['Temple', 'University', 'Alan', 'Temple', 'mobile', 'email', 'University'],
+]
+
+
+@pytest.mark.parametrize('window_size', [1, 2, 4, 10])
+@print_test
+def test_rank_words(window_size):
+    # the ranks of the sparse graph are the ones of the dense matrix
+    tr4w = TextRank4Keyword.__new__(TextRank4Keyword)
+    vocab = tr4w.get_vocab(SENTENCES)
+    g = tr4w.get_matrix(vocab, tr4w.get_token_pairs(window_size, SENTENCES))
+    expected = np.ones(len(vocab))
+    for _ in range(100):
+        expected = 0.15 + 0.85 * g.dot(expected)
+
+    pr = rank_words(vocab, SENTENCES, window_size, steps=100, min_diff=1e-12)
+    assert np.allclose(pr, expected)
+    assert len(rank_words({}, [], window_size)) == 0
+
+
+@print_test
+def test_get_token_pairs():
+    tr4w = TextRank4Keyword.__new__(TextRank4Keyword)
+    pairs = tr4w.get_token_pairs(3, [['a', 'b', 'a', 'b'], ['a', 'b']])
+    assert pairs == [('a', 'b'), ('a', 'a'), ('b', 'a'), ('b', 'b')]
+
+
+class CountingVocab(dict):
+    def __init__(self):
+        super().__init__()
+        self.lookups = 0
+
+    def __getitem__(self, word):
+        self.lookups += 1
+        return self.setdefault(word, SimpleNamespace(is_stop=False))
+
+
+class Pipeline(object):
+    def __init__(self):
+        self.vocab = CountingVocab()
+
+
+@print_test
+def test_mark_stopwords():
+    nlp = Pipeline()
+    stopwords = frozenset(['fox', 'dog'])
+    marked = mark_stopwords(nlp, stopwords)
+    assert marked == DEFAULT_STOP_WORDS | stopwords
+    assert nlp.vocab['fox'].is_stop and nlp.vocab['the'].is_stop
+    lookups = nlp.vocab.lookups
+
+    # the vocab is written once per set of stopwords
+    assert mark_stopwords(nlp, ['dog', 'fox']) is marked
+    assert nlp.vocab.lookups == lookups
+    assert mark_stopwords(nlp, ['fox', 'cat']) == DEFAULT_STOP_WORDS | {'fox', 'cat'}
+    assert nlp.vocab.lookups == lookups + 1
+    assert not mark_stopwords(Pipeline()) & stopwords
+
+
+@print_test
+def test_mark_stopwords_threads():
+    nlp = Pipeline()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(mark_stopwords(nlp, ['fox'])))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 8 and all(result is results[0] for result in results)
+    assert nlp.vocab.lookups == len(DEFAULT_STOP_WORDS | {'fox'})
+
+
+@print_test
+def test_sentence_segment_ignores_stopword_case():
+    nlp = spacy.blank('en')
+    nlp.add_pipe('sentencizer')
+    tr4w = TextRank4Keyword(nlp)
+    tr4w.set_stopwords(['fox'])
+    tr4w.doc = nlp('Fox and fox chase the Hound')
+    for token in tr4w.doc:
+        token.pos_ = 'NOUN'
+    assert tr4w.sentence_segment(['NOUN'], lower=False) == [['chase', 'Hound']]
+
+
+@print_test
+def test_parse_date():
+    date = parse_date('January 4, 1937', 'en')
+    assert (date.year, date.month, date.day) == (1937, 1, 4)
+    assert parse_date('January 4, 1937', 'en') is date
+    # no dateparser language for the multi-language model
+    assert parse_date('January 4, 1937', 'xx') == date
+    assert parse_date('4/1/1937', 'en', {'DATE_ORDER': 'DMY'}).month == 1
+    assert parse_date('4/1/1937', 'en', {'DATE_ORDER': 'MDY'}).month == 4
+    # settings with lists are cached too
+    parsers = {'PARSERS': ['absolute-time']}
+    assert parse_date('January 4, 1937', 'en', parsers) == date
+    assert parse_date('January 4, 1937', 'en', parsers) is parse_date('January 4, 1937', 'en', parsers)
+    assert parsers == {'PARSERS': ['absolute-time']}
+
+
+@print_test
+def test_parse_date_cache(monkeypatch):
+    calls = []
+    parse = dateparser.parse
+
+    def counting_parse(text, *args, **kwargs):
+        calls.append(text)
+        return parse(text, *args, **kwargs)
+
+    monkeypatch.setattr(dateparser, 'parse', counting_parse)
+    named_entity_recognition._parse_date.cache_clear()
+    # an unknown language is looked up once, not retried on every call
+    for _ in range(3):
+        assert parse_date('January 4, 1937', 'zz').year == 1937
+    assert calls == ['', 'January 4, 1937']
+
+    # relative dates are cached for the day
+    base = {'RELATIVE_BASE': datetime.datetime(2020, 6, 15)}
+    assert parse_date('yesterday', 'en', base).day == 14
+    monkeypatch.setattr(utils, '_date_cache_day', datetime.date(2000, 1, 1))
+    assert parse_date('yesterday', 'en', base).day == 14
+    assert calls.count('yesterday') == 2
+
+
+@print_test
+def test_get_dates_without_entities():
+    tr4w = TextRank4Keyword.__new__(TextRank4Keyword)
+    tr4w.nlp = SimpleNamespace(lang='en')
+    tr4w.doc = SimpleNamespace(ents=[], text='I arrived in that city on January 4, 1937')
+    assert tr4w.get_dates(extract_from_text=False) == []
+    assert tr4w.get_dates()[0].year == 1937
+
+
 def test_methods():
     nlp = spacy.load("en_core_web_sm")
     # use spacy language specific STOP WORDS
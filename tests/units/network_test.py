@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+All unit tests for the scraper network layer should be contained in this file.
+"""
+import asyncio
+import io
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+import requests
+from scraper import Article, Configuration, download_articles
+from scraper.article import DOWNLOADED
+from scraper.network import BINARY_CONTENT, PDF_CONTENT, TEXT_CONTENT, ResponseTooLarge, \
+    UnsupportedContent, async_request, get_html_2XX_only, get_session, read_content, sniff_content
+from tests.conftest import print_test, mock_resource_with
+
+
+@print_test
+def test_session_is_reused_per_thread():
+    config = Configuration()
+    session = get_session(config)
+    assert session is get_session(config)
+    # a different config with the same pool settings shares the session
+    assert session is get_session(Configuration())
+
+    sessions = []
+    thread = threading.Thread(target=lambda: sessions.append(get_session(config)))
+    thread.start()
+    thread.join()
+    assert sessions[0] is not session
+    # ... but every thread shares the same keep-alive connection pools
+    assert sessions[0].get_adapter('https://') is session.get_adapter('https://')
+
+
+@print_test
+def test_session_pool_settings():
+    config = Configuration()
+    config.pool_maxsize = 3
+    config.max_retries = 5
+    adapter = get_session(config).get_adapter('http://')
+    assert adapter is not get_session(Configuration()).get_adapter('http://')
+    assert adapter.max_retries.total == 5
+    assert adapter._pool_maxsize == 3
+
+
+class CookieHandler(BaseHTTPRequestHandler):
+    """Sets a cookie on /set and answers the cookies it was sent
+    """
+
+    def do_GET(self):
+        body = (self.headers.get('Cookie') or '').encode('utf-8')
+        self.send_response(200)
+        if self.path == '/set':
+            self.send_header('Set-Cookie', 'consent=yes; Path=/')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@print_test
+def test_session_does_not_keep_cookies():
+    server = HTTPServer(('127.0.0.1', 0), CookieHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = 'http://127.0.0.1:%d' % server.server_port
+        session = get_session(Configuration())
+        assert session.get(url + '/set').headers['Set-Cookie']
+        assert session.get(url + '/echo').text == ''
+        assert not session.cookies
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@print_test
+def test_async_request(http_server):
+    urls = ['%s/html/%s.html' % (http_server, name)
+            for name in ['cnn_article', 'slate.com1', 'does_not_exist', 'wired.com1']]
+    mrequests = async_request(urls)
+    assert [mrequest.url for mrequest in mrequests] == urls
+    assert mrequests[0].exception is None
+    assert 'Thanksgiving' in mrequests[0].html
+    assert mrequests[2].exception is not None
+    assert mrequests[2].html is None
+
+
+@print_test
+def test_async_request_from_running_loop(http_server):
+    urls = ['%s/html/cnn_article.html' % http_server, '%s/html/does_not_exist.html' % http_server]
+
+    async def main():
+        return async_request(urls)
+
+    mrequests = asyncio.run(main())
+    assert [mrequest.url for mrequest in mrequests] == urls
+    assert mrequests[0].html == mock_resource_with('cnn_article', 'html')
+    assert mrequests[1].exception is not None
+
+
+@print_test
+def test_download_articles(http_server):
+    names = ['cnn_article', 'slate.com1', 'does_not_exist']
+    articles = [Article('%s/html/%s.html' % (http_server, name)) for name in names]
+    config = Configuration()
+    config.number_threads = 2
+    config.max_connections_per_host = 1
+    download_articles(articles, config)
+    html = mock_resource_with('cnn_article', 'html')
+    assert articles[0].html == html
+    assert DOWNLOADED in articles[1].workflow
+    assert DOWNLOADED not in articles[2].workflow
+    assert '404' in articles[2].download_exception_msg
+
+
+def streamed_response(body, headers=None):
+    response = requests.Response()
+    response.status_code = 200
+    response.url = 'http://example.com/file'
+    response.headers.update(headers or {})
+    response.raw = io.BytesIO(body)
+    return response
+
+
+@pytest.mark.parametrize('chunk, content_type, expected', [
+    (b'<!DOCTYPE html><html>', 'text/html; charset=utf-8', TEXT_CONTENT),
+    (b'%PDF-1.4\n%\xe2\xe3', 'application/octet-stream', PDF_CONTENT),
+    (b'\x89PNG\r\n\x1a\n', 'text/html', BINARY_CONTENT),
+    (b'PK\x03\x04\x14\x00', None, BINARY_CONTENT),
+    (b'<html>', 'video/mp4', BINARY_CONTENT),
+    (b'\x00\x01\x02\x03', 'application/octet-stream', BINARY_CONTENT),
+    (b'\xff\xfe<\x00h\x00', 'text/html', TEXT_CONTENT),
+    (b'<\x00h\x00', 'text/html; charset=utf-16le', TEXT_CONTENT),
+])
+@print_test
+def test_sniff_content(chunk, content_type, expected):
+    assert sniff_content(chunk, content_type) == expected
+
+
+@print_test
+def test_read_content():
+    config = Configuration()
+    config.download_chunk_size = 10
+    response = streamed_response(b'<html>' + b'x' * 100 + b'</html>', {'content-type': 'text/html'})
+    assert read_content(response, config) == TEXT_CONTENT
+    assert response.text == '<html>' + 'x' * 100 + '</html>'
+
+    # without a content-length the download stops at the first chunk past the limit
+    config.max_download_size = 50
+    body = io.BytesIO(b'<html>' + b'x' * 1000)
+    response = streamed_response(b'')
+    response.raw = body
+    with pytest.raises(ResponseTooLarge):
+        read_content(response, config)
+    assert body.tell() <= 60
+
+    response = streamed_response(b'<html></html>', {'content-length': '1000000'})
+    with pytest.raises(ResponseTooLarge):
+        read_content(response, config)
+    assert response.raw.tell() == 0
+
+    response = streamed_response(b'GIF89a' + b'\x00' * 1000)
+    with pytest.raises(UnsupportedContent):
+        read_content(response, config)
+    assert response.raw.tell() == 10
+
+
+@print_test
+def test_get_html_size_limit(http_server):
+    url = '%s/html/cnn_article.html' % http_server
+    config = Configuration()
+    html, pdf_file_reader = get_html_2XX_only(url, config)
+    assert html == mock_resource_with('cnn_article', 'html')
+    config.max_download_size = 1024
+    with pytest.raises(ResponseTooLarge):
+        get_html_2XX_only(url, config)
+    mrequest = async_request([url], config)[0]
+    assert isinstance(mrequest.exception, ResponseTooLarge)
+    assert mrequest.html is None
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+All unit tests for the output formatter should be contained in this file.
+"""
+
+import lxml.html
+import pytest
+
+from scraper import Configuration
+from scraper.output_formatter import OutputFormatter
+from scraper.parser import Parser
+
+
+def formatter_for(html):
+    formatter = OutputFormatter(Configuration())
+    formatter.top_node = Parser.from_string(html)
+    return formatter
+
+
+@pytest.mark.parametrize('html, expected', [
+    ('<div><p>text</p><p> </p><span><i></i></span></div>', '<div><p>text</p></div>'),
+    ('<div><p>a<span></span> tail</p></div>', '<div><p>a  tail</p></div>'),
+    ('<div><p><span></span><span></span>x</p></div>', '<div><p>  x</p></div>'),
+    ('<div><p><a><img src="a.jpg"></a></p><p><embed></p><p><object></object></p></div>',
+     '<div><p><a><img src="a.jpg"></a></p></div>'),
+    ('<div><p><!-- comment --></p><p><!-- comment -->tail</p></div>', '<div><p><!-- comment -->tail</p></div>'),
+])
+def test_remove_empty_tags(html, expected):
+    formatter = formatter_for(html)
+    formatter.remove_empty_tags()
+    assert Parser.node_to_string(formatter.get_top_node()) == expected
+
+
+def test_remove_empty_tags_returns_depths():
+    formatter = formatter_for('<div><p>a</p><p><span>b<b>c</b></span></p><p></p></div>')
+    depths = formatter.remove_empty_tags()
+    top_node = formatter.get_top_node()
+    assert len(top_node) == 2
+    assert [depths[node] for node in top_node] == [1, 3]
+    assert depths[top_node] == 4
+    assert all(depths[node] == formatter.get_depth(node) for node in top_node.iter())
+
+
+def test_deep_nesting():
+    top_node = node = lxml.html.HtmlElement()
+    top_node.tag = 'div'
+    for _ in range(5000):
+        node = lxml.etree.SubElement(node, 'div')
+    node.text = 'deep'
+    lxml.etree.SubElement(top_node, 'p').text = 'a'
+    lxml.etree.SubElement(top_node, 'p')
+    formatter = OutputFormatter(Configuration())
+    formatter.top_node = top_node
+    depths = formatter.remove_empty_tags()
+    assert depths[top_node] == 5001
+    assert formatter.get_depth(top_node) == 5001
+    assert len(top_node) == 2
@@ -6,8 +6,11 @@ All unit tests for the scraper public API should be contained in this file.
 from scraper.patterns import get_voltage, get_email, get_mobile_number
 from tests.conftest import print_test
 from scraper.parser import Parser
+import copy
 import re
 
+import pytest
+
 # https://www.power-technology.com/projects/dai-nanh/
 
 def test_parser(fixture_directory):
@@ -30,4 +33,28 @@ def test_parser(fixture_directory):
     assert len1
     text = Parser.get_text(doc2)
     assert text
-    pass
\ No newline at end of file
+    pass
+
+
+def _link(html):
+    link = copy.deepcopy(Parser.from_string(html))
+    link.tail = None
+    return link
+
+
+@pytest.mark.parametrize('pieces', [
+    ['Just some text'],
+    ['By', ' ', '<a href="/author">Jane <span class="name">Doe</span></a>', ' ', ', and more'],
+    [' ', '<a href="/x">leading link</a>', ' ', 'then text'],
+    ['text', ' ', '<a href="/a">one</a>', ' ', ' ', '<a href="/b"><img src="b.jpg"/></a>', ' '],
+    ['AT&T and 1 < 2'],
+    ['text', ' ', '<a href="/x"><p>block</p></a>', ' '],
+])
+def test_fragment_to_para(pieces):
+    pieces = [_link(piece) if piece.startswith('<') else piece for piece in pieces]
+    html = ''.join(piece if isinstance(piece, str) else Parser.outer_html(piece) for piece in pieces)
+    para = Parser.fragment_to_para(pieces)
+    if para is not None:
+        assert Parser.node_to_string(para) == Parser.node_to_string(Parser.text_to_para(html))
+    else:
+        assert '&' in html or '<p>' in html
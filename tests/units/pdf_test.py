@@ -2,11 +2,23 @@
 """
 All unit tests for the scraper pdf processing should be contained in this file.
 """
+import os
+import pickle
+
 import pytest
 
-from scraper import Article, Configuration
+from scraper import Article, Configuration, pdf
+from scraper.article import PARSED
+from scraper.pdf import LazyPdfFileReader, extract_pages, get_pdf_text
 from tests.conftest import print_test
 
+PDF_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'fixtures', 'pdf', 'www.econstor.eu.pdf')
+
+
+def read_pdf_fixture():
+    with open(PDF_FIXTURE, 'rb') as f:
+        return f.read()
+
 
 @print_test
 def test_article_pdf_ignoring():
@@ -36,3 +48,53 @@ def test_article_pdf_fetching():
     assert len(article.text) > len(article.summary)
     assert article.text
     assert article.url
+
+
+def test_lazy_pdf_file_reader():
+    pdf_file_reader = LazyPdfFileReader(read_pdf_fixture())
+    assert pdf_file_reader._reader is None
+    assert pdf_file_reader.documentInfo.author == 'joe kenneway'
+    assert pdf_file_reader.documentInfo.getText('/CreationDate').startswith('D:20051003')
+    assert pdf_file_reader.numPages == 29
+
+
+def test_get_pdf_text():
+    content = read_pdf_fixture()
+    text = get_pdf_text(content)
+    assert text
+    first_pages = get_pdf_text(content, max_pages=3)
+    assert first_pages and text.startswith(first_pages)
+    assert len(first_pages) < len(text)
+
+
+
+def test_get_pdf_text_in_processes(monkeypatch):
+    content = read_pdf_fixture()
+    monkeypatch.setattr(pdf, 'MIN_PAGES_PER_PROCESS', 5)
+    # the page ranges of the processes are joined in page order
+    pages = [extract_pages(content, i, i + 1) for i in range(29)]
+    assert get_pdf_text(content, processes=3) == ''.join(pages)
+    assert get_pdf_text(content, max_pages=12, processes=3) == ''.join(pages[:12])
+    # too few pages to split
+    assert get_pdf_text(content, max_pages=9, processes=3) == ''.join(pages[:9])
+
+
+def test_pdf_reader_is_lazy():
+    content = read_pdf_fixture()
+    article = Article('http://example.com/paper.pdf')
+    article.download(input_html='the text', pdf_file_reader=LazyPdfFileReader(content))
+    assert article.text == 'the text'
+    assert article.pdf._reader is None
+    # survives being sent to a worker process and back
+    assert pickle.loads(pickle.dumps(article.pdf)).content == content
+
+    article.parse()
+    assert PARSED in article.workflow
+    assert article.authors == ['joe kenneway']
+    assert article.publish_date == '2005-10-03'
+
+    # a later html download is parsed as html
+    article.download(input_html='<html><body><p>the html</p></body></html>')
+    assert article.pdf is None
+    article.parse()
+    assert article.doc is not None
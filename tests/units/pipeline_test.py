@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+All unit tests for the scraper build pipeline should be contained in this file.
+"""
+
+import os
+import threading
+
+from scraper import Configuration, build_articles, language_models, pipeline
+from scraper.article import DOWNLOADED, NLPED, PARSED
+from tests.conftest import mock_resource_with
+
+
+def test_build_articles_without_nlp(http_server):
+    names = ['cnn_article', 'slate.com1', 'wired.com1', 'does_not_exist']
+    urls = ['%s/html/%s.html' % (http_server, name) for name in names]
+    config = Configuration()
+    config.fetch_images = False
+    config.use_canonical_link = False
+    config.number_threads = 2
+    articles = {article.url: article
+                for article in build_articles(urls, config, parse_processes=2, max_pending=1, nlp=False)}
+    assert sorted(articles.keys()) == sorted(urls)
+
+    cnn = articles[urls[0]]
+    assert PARSED in cnn.workflow
+    assert NLPED not in cnn.workflow
+    assert cnn.text == mock_resource_with('cnn', 'txt').strip()
+    assert cnn.doc is None and cnn.top_node is None
+
+    missing = articles[urls[-1]]
+    assert DOWNLOADED not in missing.workflow
+    assert '404' in missing.download_exception_msg
+
+
+def test_build_articles(http_server):
+    urls = ['%s/html/cnn_article.html' % http_server]
+    articles = list(build_articles(urls, languages=['en']))
+    assert len(articles) == 1
+    assert NLPED in articles[0].workflow
+    assert articles[0].keywords
+
+
+def exit_worker(article):
+    # a parse worker process dying, e.g. killed for using too much memory
+    os._exit(1)
+
+
+def test_build_articles_worker_dies(http_server, monkeypatch):
+    monkeypatch.setattr(pipeline, 'parse_article', exit_worker)
+    urls = ['%s/html/%s.html' % (http_server, name) for name in ['cnn_article', 'slate.com1', 'wired.com1']]
+    config = Configuration()
+    config.fetch_images = False
+    config.number_threads = 2
+    articles = []
+    builder = threading.Thread(
+        target=lambda: articles.extend(build_articles(urls, config, parse_processes=1, max_pending=1, nlp=False)),
+        daemon=True)
+    builder.start()
+    builder.join(timeout=60)
+    assert not builder.is_alive()
+    assert sorted(article.url for article in articles) == sorted(urls)
+    for article in articles:
+        assert DOWNLOADED in article.workflow and PARSED not in article.workflow
+        assert 'BrokenProcessPool' in article.build_exception_msg
+
+
+def test_build_articles_missing_model(http_server, monkeypatch):
+    # nlp fails article by article instead of breaking the nlp pool
+    monkeypatch.setitem(language_models.SPACY_LANGUAGE_MODELS, 'en', 'no_such_model')
+    urls = ['%s/html/cnn_article.html' % http_server]
+    config = Configuration()
+    config.fetch_images = False
+    articles = list(build_articles(urls, config, languages=['en']))
+    assert len(articles) == 1
+    assert PARSED in articles[0].workflow and NLPED not in articles[0].workflow
+    assert articles[0].build_exception_msg.startswith('nlp failed')
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+All unit tests for the seen url store and the memoization of articles
+should be contained in this file.
+"""
+import os
+import threading
+import time
+
+import pytest
+
+from scraper import Article, Configuration, settings
+from scraper.seen_urls import SeenUrlStore
+from scraper.utils import domain_to_filename, memoize_articles
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SeenUrlStore(str(tmp_path / 'seen_urls.sqlite3'))
+
+
+class Source(object):
+
+    def __init__(self, domain, config=None):
+        self.domain = domain
+        self.config = config or Configuration()
+
+
+def test_add_new(store):
+    assert store.add_new('a.com', ['http://a.com/1', 'http://a.com/2']) == ['http://a.com/1', 'http://a.com/2']
+    assert store.add_new('a.com', ['http://a.com/3', 'http://a.com/1']) == ['http://a.com/3']
+    # domains are kept apart
+    assert store.add_new('b.com', ['http://a.com/1']) == ['http://a.com/1']
+    assert store.contains('a.com', 'http://a.com/2')
+    assert not store.contains('a.com', 'http://a.com/4')
+    assert store.count('a.com') == 3
+
+
+def test_evict(store):
+    store.add_new('a.com', ['http://a.com/old'], seen_at=time.time() - 100)
+    store.add_new('a.com', ['http://a.com/%d' % i for i in range(5)])
+    store.add_new('b.com', ['http://b.com/old'], seen_at=time.time() - 100)
+    assert store.evict('a.com', ttl=50) == 1
+    assert store.contains('b.com', 'http://b.com/old')
+    assert store.evict('a.com', max_urls=3) == 2
+    assert store.count('a.com') == 3
+
+
+def test_evict_urls_seen_at_once(store):
+    # the most recently added urls are kept when they were seen at the same
+    # time, whatever the order of the urls
+    seen_at = time.time()
+    store.add_new('a.com', ['http://a.com/b%d' % i for i in range(5)], seen_at=seen_at)
+    store.add_new('a.com', ['http://a.com/a%d' % i for i in range(5)], seen_at=seen_at)
+    assert store.evict('a.com', max_urls=4) == 6
+    assert [url for url in ['http://a.com/%s%d' % (c, i) for c in 'ab' for i in range(5)]
+            if store.contains('a.com', url)] == ['http://a.com/a%d' % i for i in range(1, 5)]
+
+
+def test_concurrent_writers(store):
+    new_urls = []
+
+    def add():
+        new_urls.extend(store.add_new('a.com', ['http://a.com/%d' % i for i in range(200)]))
+
+    threads = [threading.Thread(target=add) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(new_urls) == sorted('http://a.com/%d' % i for i in range(200))
+
+
+def test_memoize_articles(store):
+    config = Configuration()
+    config.MAX_FILE_MEMO = 3
+    source = Source('a.com', config)
+    articles = [Article('http://a.com/%d' % i) for i in (1, 2, 1)]
+    assert [a.url for a in memoize_articles(source, articles, store)] == ['http://a.com/1', 'http://a.com/2']
+    articles = [Article('http://a.com/%d' % i) for i in (2, 3, 4)]
+    assert [a.url for a in memoize_articles(source, articles, store)] == ['http://a.com/3', 'http://a.com/4']
+    # only the MAX_FILE_MEMO most recent urls are remembered
+    assert store.count('a.com') == 3
+
+
+def test_memoize_articles_imports_memo_file(store):
+    path = os.path.join(settings.ensure_directory(settings.MEMO_DIR), domain_to_filename('memo-file-test.com'))
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('http://memo-file-test.com/1\r\nhttp://memo-file-test.com/2')
+    articles = [Article('http://memo-file-test.com/%d' % i) for i in (1, 3)]
+    new_articles = memoize_articles('memo-file-test.com', articles, store)
+    assert [a.url for a in new_articles] == ['http://memo-file-test.com/3']
+    assert not os.path.exists(path)
+    assert store.count('memo-file-test.com') == 3
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the stopword registry
+"""
+
+import os
+import threading
+
+from scraper import settings
+from scraper.text import StopWords, StopWordsChinese, get_stopwords, load_stop_words
+from scraper.utils import get_languages
+from tests.conftest import print_test
+
+
+@print_test
+def test_stopwords_are_cached_frozensets():
+    stopwords = get_stopwords('en')
+    assert isinstance(stopwords, frozenset)
+    assert get_stopwords('en-US') is stopwords
+    assert all(word == word.lower() for word in stopwords)
+    assert 'the' in stopwords
+
+
+@print_test
+def test_stopwords_instances_are_shared():
+    instances = []
+
+    def lookup():
+        instances.append(StopWords.for_language('en'))
+
+    threads = [threading.Thread(target=lookup) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(instance is instances[0] for instance in instances)
+    assert StopWords.for_language('fr') is not instances[0]
+    assert isinstance(StopWordsChinese.for_language('zh'), StopWordsChinese)
+    assert instances[0].get_stopword_count('The fox, and the dog.').get_stopword_count() == 3
+
+
+@print_test
+def test_stop_words_are_shipped():
+    for language_code in get_languages():
+        if language_code != 'xx':
+            assert os.path.isfile(os.path.join(settings.STOPWORDS_DIR, 'stopwords-%s.txt' % language_code))
+    assert {'the', 'and', 'of'} <= set(load_stop_words('en'))
+
+
+@print_test
+def test_stop_words_fall_back_to_spacy(monkeypatch, tmp_path):
+    import spacy.lang.en.stop_words
+    monkeypatch.setattr(settings, 'STOPWORDS_DIR', str(tmp_path))
+    assert load_stop_words('en') is spacy.lang.en.stop_words.STOP_WORDS
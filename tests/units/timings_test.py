@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+All unit tests for the stage timings of articles should be contained in this file.
+"""
+import pickle
+import tracemalloc
+
+from scraper import Article, Configuration, add_timing_hook, remove_timing_hook
+from scraper.timings import Timings
+from tests.conftest import mock_resource_with
+
+URL = 'http://www.cnn.com/2013/11/27/travel/weather-thanksgiving/index.html'
+
+
+def parsed_article(config=None):
+    config = config or Configuration()
+    config.fetch_images = False
+    article = Article(URL, config=config)
+    article.download(mock_resource_with('cnn_article', 'html'))
+    article.parse()
+    return article
+
+
+def test_parse_stages_are_timed():
+    article = parsed_article()
+    for stage in ['parse', 'parse.dom', 'parse.metadata', 'parse.images', 'parse.cleaner',
+                  'parse.best_node', 'parse.post_cleanup', 'parse.formatter', 'fetch_images']:
+        assert stage in article.timings
+        assert article.timings[stage].calls == 1
+    parse = article.timings['parse']
+    assert parse.wall >= article.timings['parse.cleaner'].wall > 0
+    assert parse.bytes == len(article.html)
+    assert article.timings['parse.formatter'].bytes == len(article.text)
+    assert parse.profile is None and parse.memory_peak is None
+    assert pickle.loads(pickle.dumps(article.timings)).as_dict() == article.timings.as_dict()
+
+
+def test_timing_hooks():
+    calls = []
+
+    def hook(article, stage, timing):
+        calls.append((article, stage, timing.calls))
+
+    add_timing_hook(hook)
+    try:
+        article = parsed_article()
+    finally:
+        remove_timing_hook(hook)
+    assert (article, 'parse', 1) == calls[-1]
+    assert (article, 'parse.cleaner', 1) in calls
+    parsed_article()
+    assert calls[-1][0] is article
+
+
+def test_profile_and_memory():
+    config = Configuration()
+    config.profile_stages = True
+    config.trace_memory = True
+    article = parsed_article(config)
+    parse = article.timings['parse']
+    assert 'calculate_best_node' in parse.profile
+    assert parse.memory_peak > 0
+    # only the outermost stage is captured
+    assert article.timings['parse.cleaner'].profile is None
+
+
+def test_memory_peak_without_reset_peak(monkeypatch):
+    # Python < 3.9
+    monkeypatch.delattr(tracemalloc, 'reset_peak', raising=False)
+    timings = Timings(trace_memory=True)
+    with timings.measure('stage'):
+        data = [bytearray(1000) for _ in range(100)]
+    assert timings['stage'].memory_peak >= 100 * 1000
+    assert not tracemalloc.is_tracing()
+
+    # tracing started elsewhere is neither stopped nor measured
+    tracemalloc.start()
+    try:
+        with timings.measure('other'):
+            data = [bytearray(1000) for _ in range(100)]
+        assert timings['other'].memory_peak is None
+        assert tracemalloc.is_tracing()
+        assert tracemalloc.get_traced_memory()[0] >= 100 * 1000
+        del data
+    finally:
+        tracemalloc.stop()
+
+
+def test_failed_stage_is_timed():
+    timings = Timings()
+    try:
+        with timings.measure('download'):
+            raise ValueError()
+    except ValueError:
+        pass
+    assert timings['download'].calls == 1
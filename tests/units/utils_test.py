@@ -3,7 +3,10 @@
 All unit tests for the scraper public API should be contained in this file.
 """
 
-from scraper.utils import get_languages, get_language_codes
+import datetime
+
+from scraper import utils
+from scraper.utils import get_languages, get_language_codes, parse_date_str
 from tests.conftest import print_test
 
 
@@ -14,3 +17,23 @@ def test_languages_api_call():
     codes = get_language_codes()
     assert codes
 
+
+
+@print_test
+def test_parse_date_str():
+    date = parse_date_str('2014-04-09T10:30:00')
+    assert (date.year, date.month, date.day, date.hour) == (2014, 4, 9, 10)
+    # the same string is parsed once
+    assert parse_date_str('2014-04-09T10:30:00') is date
+    assert parse_date_str('/2014/04/') is None
+    assert parse_date_str(None) is None
+
+
+@print_test
+def test_parse_date_str_cache_is_cleared_on_a_new_day(monkeypatch):
+    # dateutil fills the missing fields of a date in from today
+    date = parse_date_str('April 9')
+    assert date.year == datetime.date.today().year
+    monkeypatch.setattr(utils, '_date_cache_day', datetime.date(2000, 1, 1))
+    assert parse_date_str('April 9') is not date
+    assert parse_date_str('April 9') == date